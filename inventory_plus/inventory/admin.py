@@ -1,6 +1,12 @@
 from django.contrib import admin
-from .models import Product, Category, Supplier
+from .models import Product, Category, Supplier, StockMovement, StockLot, ProductTombstone, Job, PurchaseOrder, PurchaseOrderLine
 
 admin.site.register(Product)
 admin.site.register(Category)
 admin.site.register(Supplier)
+admin.site.register(StockMovement)
+admin.site.register(StockLot)
+admin.site.register(ProductTombstone)
+admin.site.register(Job)
+admin.site.register(PurchaseOrder)
+admin.site.register(PurchaseOrderLine)
@@ -0,0 +1,182 @@
+import hashlib
+from dataclasses import dataclass, field
+
+from django.contrib.auth.decorators import login_required
+from django.db.models import Max
+from django.http import Http404, HttpRequest, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from main.models import Sale
+from .models import Product, Category, Supplier, ProductTombstone
+from .pagination import KeysetPaginator
+from . import caching
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_MAX_IDS = 200
+
+
+@dataclass
+class Resource:
+    model: type
+    # public name: ORM column, in the order responses list them
+    fields: dict
+    default_fields: list
+    # caching version stamps covering every row of the resource, see inventory.caching
+    versions: tuple
+    # m2m fields listed as id arrays, each costing one extra query when requested
+    many: dict = field(default_factory=dict)
+
+
+RESOURCES = {
+    "products": Resource(
+        model=Product,
+        fields={
+            "id": "id", "name": "name", "description": "description", "quantity": "quantity",
+            "low_stock_threshold": "low_stock_threshold", "price": "price", "expiry_date": "expiry_date",
+            "category": "category_id", "created_at": "created_at", "updated_at": "updated_at",
+        },
+        default_fields=["id", "name", "quantity", "low_stock_threshold", "price", "expiry_date", "category", "updated_at"],
+        versions=("products", "suppliers"),
+        many={"suppliers": (Product.suppliers.through, "product_id", "supplier_id")},
+    ),
+    "categories": Resource(
+        model=Category,
+        fields={"id": "id", "name": "name"},
+        default_fields=["id", "name"],
+        versions=("categories",),
+    ),
+    "suppliers": Resource(
+        model=Supplier,
+        fields={"id": "id", "name": "name", "email": "email", "phone": "phone", "website": "website"},
+        default_fields=["id", "name", "email", "phone", "website"],
+        versions=("suppliers",),
+    ),
+    "sales": Resource(
+        model=Sale,
+        fields={"id": "id", "product": "product_id", "quantity": "quantity", "price_at_sale": "price_at_sale", "date": "date"},
+        default_fields=["id", "product", "quantity", "price_at_sale", "date"],
+        versions=("sales",),
+    ),
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _resource(name):
+    try:
+        return RESOURCES[name]
+    except KeyError:
+        raise Http404(f"No API resource named {name!r}")
+
+
+def _csv_param(request, name):
+    return [value for value in request.GET.get(name, "").split(",") if value]
+
+
+def _fields(request, resource):
+    names = _csv_param(request, "fields") or resource.default_fields
+    unknown = [name for name in names if name not in resource.fields and name not in resource.many]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}")
+    # the id is always sent, it is what the cursor and the m2m lists key on
+    return ["id", *(name for name in dict.fromkeys(names) if name != "id")]
+
+
+def _ids(request):
+    try:
+        ids = sorted({int(value) for value in _csv_param(request, "ids")})
+    except ValueError:
+        raise BadRequest("ids must be a comma separated list of integers")
+    if len(ids) > API_MAX_IDS:
+        raise BadRequest(f"At most {API_MAX_IDS} ids per request")
+    return ids
+
+
+def _version(request, name):
+    resource = _resource(name)
+    ids = _ids(request) if name == "products" else []
+    if ids:
+        # a batch of products only goes stale when one of them changes (or any supplier link does)
+        return caching.versions(*(caching.product_key(pk) for pk in ids), "suppliers")
+    return caching.versions(*resource.versions)
+
+
+def resource_etag(request: HttpRequest, name):
+    try:
+        version = _version(request, name)
+    except BadRequest:
+        return None
+    # the response is a function of the data version and the query, so equal tags mean byte-equal bodies
+    query = sorted((key, value) for key, value in request.GET.lists())
+    return hashlib.md5(f"{name}:{version}:{query}".encode()).hexdigest()
+
+
+def resource_last_modified(request: HttpRequest, name):
+    if name != "products":
+        return None
+    try:
+        ids = _ids(request)
+    except BadRequest:
+        return None
+    products = Product.objects.filter(pk__in=ids) if ids else Product.objects.all()
+    stamps = [products.aggregate(last=Max("updated_at"))["last"]]
+    if not ids:
+        # deleting rows leaves no updated_at behind, the tombstones do
+        stamps.append(ProductTombstone.objects.aggregate(last=Max("deleted_at"))["last"])
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+def _values(resource, fields, queryset):
+    return queryset.values(*(resource.fields[name] for name in fields if name in resource.fields))
+
+
+def _rows(resource, fields, values):
+    rows = [{name: row[resource.fields[name]] for name in fields if name in resource.fields} for row in values]
+    for name in fields:
+        if name in resource.many:
+            through, source, target = resource.many[name]
+            related = {row["id"]: [] for row in rows}
+            links = through.objects.filter(**{f"{source}__in": related.keys()}).order_by(target)
+            for source_id, target_id in links.values_list(source, target):
+                related[source_id].append(target_id)
+            for row in rows:
+                row[name] = related[row["id"]]
+    return rows
+
+
+@login_required
+@require_safe
+@condition(etag_func=resource_etag, last_modified_func=resource_last_modified)
+def resource_list_view(request: HttpRequest, name):
+    """
+    GET /api/<name>/ for products, categories, suppliers and sales.
+
+    ?fields=a,b picks the columns, ?ids=1,2 fetches a batch, otherwise pages are keyset paginated by id
+    with ?cursor= and ?limit=. Clients revalidate with If-None-Match / If-Modified-Since and get a 304
+    while nothing they asked for has changed.
+    """
+    resource = _resource(name)
+    try:
+        fields = _fields(request, resource)
+        ids = _ids(request)
+        limit = int(request.GET.get("limit", API_PAGE_SIZE))
+    except (BadRequest, ValueError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    values = _values(resource, fields, resource.model.objects.all())
+    if ids:
+        body = {"results": _rows(resource, fields, values.filter(pk__in=ids).order_by("id"))}
+    else:
+        paginator = KeysetPaginator(values, max(1, min(limit, API_MAX_PAGE_SIZE)), ordering=("id",))
+        page = paginator.get_page(request.GET.get("cursor"))
+        body = {"results": _rows(resource, fields, page), "next": page.next_cursor, "previous": page.previous_cursor}
+
+    response = JsonResponse(body, json_dumps_params={"separators": (",", ":")})
+    # cacheable by the client, but only after asking whether its copy is still current
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
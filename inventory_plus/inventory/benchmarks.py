@@ -0,0 +1,310 @@
+import asyncio
+import copy
+import io
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from main.analytics import rebuild_rollups
+from main.models import Sale
+from main.profiling import percentile
+from .models import Category, Product, StockLot, Supplier
+from .search import rebuild_index
+from .summary import rebuild_summary
+
+CATALOG_BATCH_SIZE = 5000
+WORDS = (
+    "steel", "cotton", "organic", "premium", "compact", "heavy", "mini", "classic", "fresh", "smart",
+    "widget", "bolt", "shirt", "coffee", "lamp", "cable", "filter", "battery", "bottle", "sensor",
+)
+
+
+def _insert_rows(table, columns, rows):
+    placeholders = ", ".join(["%s"] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+def generate_catalog(products=10000, categories=50, suppliers=200, suppliers_per_product=2,
+                     sales_per_product=5, history_days=180, lots_per_product=3, seed=0, progress=None):
+    """
+    Fill an empty database with a synthetic catalog: categories, suppliers, products with
+    `suppliers_per_product` suppliers each, their stock split over up to `lots_per_product` lots,
+    and `sales_per_product` sales spread over the last `history_days` days. Everything is bulk inserted, then the stock summary, search index and
+    sales rollups are rebuilt once. The same seed always builds the same catalog.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    now = timezone.now()
+    progress = progress or (lambda message: None)
+
+    with transaction.atomic():
+        category_ids = [
+            c.id for c in Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(categories))
+        ]
+        supplier_ids = [
+            s.id for s in Supplier.objects.bulk_create(
+                Supplier(name=f"Supplier {i}", email=f"supplier{i}@example.com", phone=f"05{i:08d}")
+                for i in range(suppliers)
+            )
+        ]
+        progress(f"{categories} categories, {suppliers} suppliers")
+
+        product_ids = []
+        lot_count = 0
+        for start in range(0, products, CATALOG_BATCH_SIZE):
+            batch, batch_lots = [], []
+            for i in range(start, min(start + CATALOG_BATCH_SIZE, products)):
+                threshold = rng.randint(1, 20)
+                quantity = rng.choice((0, rng.randint(0, threshold), rng.randint(0, 500)))
+                # [(quantity, expiry_date)] summing to quantity; perishables get dated lots
+                perishable = rng.random() < 0.3
+                cuts = sorted(rng.randint(0, quantity) for _ in range(rng.randint(1, lots_per_product) - 1))
+                lots = [
+                    (high - low, today + timedelta(days=rng.randint(-30, 365)) if perishable else None)
+                    for low, high in zip([0, *cuts], [*cuts, quantity])
+                    if high > low
+                ]
+                batch_lots.append(lots)
+                batch.append(Product(
+                    name=f"{' '.join(rng.sample(WORDS, 3)).title()} {i}",
+                    description=" ".join(rng.choices(WORDS, k=12)),
+                    quantity=quantity,
+                    low_stock_threshold=threshold,
+                    expiry_date=min((expiry for _, expiry in lots if expiry), default=None),
+                    category_id=rng.choice(category_ids) if category_ids else None,
+                    price=Decimal(rng.randint(100, 50000)) / 100,
+                ))
+            created = Product.objects.bulk_create(batch)
+            product_ids.extend(p.id for p in created)
+            StockLot.objects.bulk_create(
+                StockLot(product_id=product.id, quantity=quantity, expiry_date=expiry, received_at=now)
+                for product, lots in zip(created, batch_lots)
+                for quantity, expiry in lots
+            )
+            lot_count += sum(len(lots) for lots in batch_lots)
+        progress(f"{len(product_ids)} products in {lot_count} lots")
+
+        fan_out = min(suppliers_per_product, len(supplier_ids))
+        through = Product.suppliers.through
+        for start in range(0, len(product_ids), CATALOG_BATCH_SIZE):
+            _insert_rows(through._meta.db_table, ("product_id", "supplier_id"), [
+                (product_id, supplier_id)
+                for product_id in product_ids[start:start + CATALOG_BATCH_SIZE]
+                for supplier_id in rng.sample(supplier_ids, fan_out)
+            ])
+        progress(f"{len(product_ids) * fan_out} product/supplier links")
+
+        # raw INSERTs: Sale.date is auto_now_add, bulk_create() would stamp every sale with now
+        date_field = Sale._meta.get_field("date")
+        for start in range(0, len(product_ids), CATALOG_BATCH_SIZE):
+            _insert_rows(Sale._meta.db_table, ("product_id", "quantity", "price_at_sale", "date"), [
+                (
+                    product_id,
+                    rng.randint(1, 10),
+                    str(Decimal(rng.randint(100, 50000)) / 100),
+                    date_field.get_db_prep_save(now - timedelta(minutes=rng.randint(0, history_days * 24 * 60)), connection),
+                )
+                for product_id in product_ids[start:start + CATALOG_BATCH_SIZE]
+                for _ in range(sales_per_product)
+            ])
+        progress(f"{len(product_ids) * sales_per_product} sales")
+
+    rebuild_summary()
+    rebuild_index()
+    rebuild_rollups()
+    progress("summary, search index and sales rollups rebuilt")
+
+
+def _view(url):
+    def run(client):
+        response = client.get(url)
+        assert response.status_code == 200, f"{url} returned {response.status_code}"
+    return run
+
+
+def _reset_alert_throttle():
+    # every run has to find the same products to alert on
+    Product.objects.update(last_low_stock_notified=None, last_expiry_notified=None)
+
+
+def _send_alerts(client):
+    call_command("send_alerts", stdout=io.StringIO())
+
+
+def default_scenarios():
+    """{name: (setup, run)}; setup runs untimed before every iteration, run gets the logged-in client."""
+    return {
+        "all_products_view": (None, _view(reverse("inventory:all_products_view"))),
+        "search_products_view": (None, _view(reverse("inventory:search_products_view") + "?search=steel+widget")),
+        "stock_status_view": (None, _view(reverse("inventory:stock_status_view"))),
+        "supplier_report_view": (None, _view(reverse("inventory:supplier_reports"))),
+        "send_alerts": (_reset_alert_throttle, _send_alerts),
+    }
+
+
+def _latencies(timings):
+    timings = sorted(timings)
+    return {
+        "iterations": len(timings),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "min_ms": round(timings[0], 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def _summarise(timings, query_counts):
+    return {**_latencies(timings), "queries": max(query_counts), "queries_min": min(query_counts)}
+
+
+def _benchmark_user():
+    # reused on --keepdb runs
+    return User.objects.filter(username="benchmark").first() or User.objects.create_superuser(
+        "benchmark", "benchmark@example.com", "benchmark"
+    )
+
+
+def run_benchmarks(scenarios, iterations=20, warmup=2, user=None):
+    """Run every scenario `warmup` times untimed, then `iterations` times; returns {name: summary}."""
+    client = Client()
+    client.force_login(user or _benchmark_user())
+
+    results = {}
+    for name, (setup, scenario) in scenarios.items():
+        timings, query_counts = [], []
+        for i in range(warmup + iterations):
+            if setup:
+                setup()
+            if i < warmup:
+                scenario(client)
+                continue
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                scenario(client)
+                timings.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(queries))
+        results[name] = _summarise(timings, query_counts)
+    return results
+
+
+def default_concurrent_scenarios():
+    """{name: (url, async url)}: the pages that have an async twin, see the ASYNC DASHBOARDS views."""
+    return {
+        "stock_status": (reverse("inventory:stock_status_view"), reverse("inventory:stock_status_async_view")),
+    }
+
+
+def _load_summary(timings, seconds):
+    return {**_latencies(timings), "requests_per_second": round(len(timings) / seconds, 1)}
+
+
+def _check(response, url):
+    assert response.status_code == 200, f"{url} returned {response.status_code}"
+
+
+def _wsgi_load(url, cookies, concurrency, requests):
+    # what a threaded WSGI server does: one request per thread, each thread with its own connection
+    def worker(count):
+        client = Client()
+        client.cookies = copy.deepcopy(cookies)
+        timings = []
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                _check(client.get(url), url)
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+        return timings
+
+    counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        timings = [t for result in pool.map(worker, counts) for t in result]
+        return _load_summary(timings, time.perf_counter() - start)
+
+
+async def _asgi_get(application, url, cookie):
+    # the scope/receive/send exchange an ASGI server has with the application; AsyncClient skips the
+    # per-request ThreadSensitiveContext the real handler sets up, so it would run all sync work on one thread
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+    }
+    status = None
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # the client stays connected, the handler cancels this wait once the response is out
+            await asyncio.Future()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await application(scope, receive, send)
+    assert status == 200, f"{url} returned {status}"
+
+
+async def _asgi_load(url, cookies, concurrency, requests):
+    # the project's ASGI application on one event loop, `concurrency` clients keeping a request in flight each
+    application = get_asgi_application()
+    cookie = "; ".join(f"{name}={morsel.value}" for name, morsel in cookies.items())
+
+    async def worker(count):
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            await _asgi_get(application, url, cookie)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(worker(count) for count in counts))
+    return _load_summary([t for result in results for t in result], time.perf_counter() - start)
+
+
+def run_concurrent_benchmarks(scenarios, concurrency=16, requests=200, warmup=2, user=None):
+    """
+    Load each page's WSGI view from `concurrency` threads and its async twin through the ASGI application
+    with as many requests in flight; returns {name: {"wsgi": summary, "asgi": summary}}.
+    """
+    # one session shared by every client, logging in from many threads at once would race on it
+    client = Client()
+    client.force_login(user or _benchmark_user())
+    results = {}
+    for name, (url, async_url) in scenarios.items():
+        _wsgi_load(url, client.cookies, 1, warmup)
+        asyncio.run(_asgi_load(async_url, client.cookies, 1, warmup))
+        wsgi = _wsgi_load(url, client.cookies, concurrency, requests)
+        asgi = asyncio.run(_asgi_load(async_url, client.cookies, concurrency, requests))
+        results[name] = {
+            "wsgi": wsgi,
+            "asgi": asgi,
+            "p50_speedup": round(wsgi["p50_ms"] / asgi["p50_ms"], 2),
+        }
+    return results
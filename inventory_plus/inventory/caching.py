@@ -0,0 +1,64 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import routers
+
+CACHE_TIMEOUT = getattr(settings, "INVENTORY_CACHE_TIMEOUT", 600)
+_MISSING = object()
+
+
+def _version_key(name):
+    return f"inventory:version:{name}"
+
+
+def product_key(product_id):
+    return f"product:{product_id}"
+
+
+def versions(*names):
+    """
+    Current version stamps of the named objects or lists, joined into one string to key cache entries on.
+
+    A stamp is replaced (never reset) whenever its data changes, see bump(); a stamp that was
+    evicted comes back as a fresh one, so stale entries are never picked up again.
+    """
+    version = _stamps(names)
+    if routers.reading_from_replica():
+        # the replica may not have caught up with the stamps yet: what it computes is kept apart and
+        # recomputed when it is refreshed (sync_replica bumps "replica") or REPLICA_MAX_LAG has passed
+        window = int(time.time() // routers.REPLICA_MAX_LAG)
+        version = f"{version}.{_stamps(['replica'])}.{window}"
+    return version
+
+
+def _stamps(names):
+    keys = [_version_key(name) for name in names]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return ".".join(str(found[key]) for key in keys)
+
+
+def bump(*names):
+    if names:
+        stamp = time.time_ns()
+        cache.set_many({_version_key(name): stamp for name in names}, timeout=None)
+
+
+def bump_products(product_ids):
+    bump("products", *(product_key(pk) for pk in product_ids))
+
+
+def cached(name, version, compute, timeout=CACHE_TIMEOUT):
+    """Return compute()'s result, cached under `name` for as long as `version` stays current."""
+    key = f"inventory:{hashlib.md5(name.encode()).hexdigest()}:{version}"
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,31 @@
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _own_connection(func):
+    @functools.wraps(func)
+    def run():
+        # worker threads get their own connection; close_old_connections() applies CONN_MAX_AGE to it
+        # the same way request_started/request_finished do for a request's connection
+        close_old_connections()
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather_queries(*funcs):
+    """
+    Run independent blocking query functions at the same time and return their results in order.
+
+    Django's async ORM hands every query to the one thread-sensitive executor, so gathering
+    acount()/aget() calls still runs them one after another on a single connection. Each function
+    here gets a worker thread and a database connection of its own instead. Functions must
+    evaluate their querysets (list(), get(), aggregate()) before returning, and because they read
+    outside the caller's connection they only see committed data.
+    """
+    return await asyncio.gather(*(sync_to_async(_own_connection(func), thread_sensitive=False)() for func in funcs))
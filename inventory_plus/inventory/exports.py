@@ -0,0 +1,83 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
+from .models import Product, Supplier
+from .reports import stock_status_querysets
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ("csv", "json")
+
+PRODUCT_HEADER = [
+    "id", "name", "description", "quantity", "low_stock_threshold", "price",
+    "expiry_date", "category", "suppliers", "created_at", "updated_at",
+]
+STOCK_STATUS_HEADER = ["status", "id", "name", "quantity", "low_stock_threshold", "expiry_date", "lot_id"]
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def json_lines(header, rows):
+    yield "["
+    separator = "\n"
+    for row in rows:
+        yield separator + json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder, ensure_ascii=False)
+        separator = ",\n"
+    yield "\n]\n"
+
+
+def export_lines(header, rows, fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+    return csv_lines(header, rows) if fmt == "csv" else json_lines(header, rows)
+
+
+def streaming_export_response(header, rows, fmt, filename):
+    content_type = "text/csv" if fmt == "csv" else "application/json"
+    response = StreamingHttpResponse(export_lines(header, rows, fmt), content_type=f"{content_type}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def product_rows():
+    products = (
+        Product.objects.select_related("category")
+        .prefetch_related(Prefetch("suppliers", queryset=Supplier.objects.only("id", "name")))
+        .order_by("id")
+    )
+    for p in products.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            p.id, p.name, p.description, p.quantity, p.low_stock_threshold, p.price,
+            p.expiry_date, p.category.name if p.category else "",
+            ";".join(s.name for s in p.suppliers.all()), p.created_at, p.updated_at,
+        ]
+
+
+def stock_status_rows(expiring_days=30):
+    buckets = stock_status_querysets(expiring_days)
+    rows = buckets.pop("low_stock").values_list("id", "name", "quantity", "low_stock_threshold", "expiry_date")
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield ["low_stock", *row, None]
+    # one row per lot: quantity is the lot's, not the product's
+    for status, lots in buckets.items():
+        rows = lots.values_list(
+            "product_id", "product__name", "quantity", "product__low_stock_threshold", "expiry_date", "id"
+        )
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield [status, *row]
@@ -0,0 +1,219 @@
+import csv
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Product, Category, Supplier, StockMovement
+from .retry import retry_on_lock
+from . import caching, lots, search, summary
+
+
+IMPORT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 200
+UPDATE_FIELDS = ["description", "quantity", "low_stock_threshold", "price", "expiry_date", "category", "updated_at"]
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "message": message})
+
+
+def _count(value, default):
+    value = (value or "").strip()
+    if value == "":
+        return default
+    number = int(value)
+    if number < 0:
+        raise ValueError("negative numbers are not allowed")
+    return number
+
+
+def _parse_row(row):
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing name")
+    try:
+        price = Decimal((row.get("price") or "0").strip() or "0")
+    except InvalidOperation:
+        raise ValueError(f"invalid price {row.get('price')!r}")
+    expiry = (row.get("expiry_date") or "").strip()
+    return {
+        "name": name,
+        "description": (row.get("description") or "").strip(),
+        "quantity": _count(row.get("quantity"), 0),
+        "low_stock_threshold": _count(row.get("low_stock_threshold"), 5),
+        "price": price,
+        "expiry_date": date.fromisoformat(expiry) if expiry else None,
+        "category": (row.get("category") or "").strip(),
+        # None when the file has no suppliers column, so existing links are left alone
+        "suppliers": None if "suppliers" not in row else [
+            s.strip() for s in (row["suppliers"] or "").split(";") if s.strip()
+        ],
+    }
+
+
+class ProductImporter:
+    """
+    Streams product rows into the database in batches.
+
+    Category and supplier names are resolved through dictionaries loaded once per import, missing
+    categories are created in bulk. Suppliers need an email and phone the file doesn't carry, so rows
+    naming an unknown supplier are reported instead. Products are matched by name when `upsert` is on,
+    and every quantity they gain or lose is written to the stock ledger.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, upsert=True, user=None):
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.user = user
+        self.report = ImportReport()
+        self.categories = dict(Category.objects.values_list("name", "id"))
+        self.suppliers = {}
+        for supplier_id, name in Supplier.objects.order_by("-id").values_list("id", "name"):
+            self.suppliers[name] = supplier_id
+
+    def run(self, rows):
+        numbered = enumerate(rows, start=2)  # row 1 is the CSV header
+        while True:
+            batch = list(islice(numbered, self.batch_size))
+            if not batch:
+                break
+            self._import_batch(batch)
+        summary.rebuild_summary()
+        # new products, categories and supplier links went in through bulk writes, without signals
+        caching.bump("products", "categories", "suppliers")
+        return self.report
+
+    def _resolve_categories(self, names):
+        missing = {name for name in names if name and name not in self.categories}
+        if missing:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            self.categories.update(Category.objects.filter(name__in=missing).values_list("name", "id"))
+
+    def _import_batch(self, batch):
+        parsed = {}
+        for number, row in batch:
+            try:
+                item = _parse_row(row)
+            except ValueError as e:
+                self.report.add_error(number, str(e))
+                continue
+            unknown = [name for name in item["suppliers"] or [] if name not in self.suppliers]
+            if unknown:
+                self.report.add_error(number, f"unknown supplier {', '.join(unknown)}, add it on the suppliers page first")
+                continue
+            # the last row wins when a name repeats inside a batch
+            parsed[item["name"]] = item
+
+        if not parsed:
+            return
+
+        new_products, updated_products = self._write_batch(parsed)
+        self.report.created += len(new_products)
+        self.report.updated += len(updated_products)
+        search.index_products([p.id for p in new_products + updated_products])
+        caching.bump_products([p.id for p in updated_products])
+
+    @retry_on_lock
+    def _write_batch(self, parsed):
+        # the name -> id map picks up the categories a failed attempt created and rolled back, so it is put back
+        categories = dict(self.categories)
+        try:
+            with transaction.atomic():
+                self._resolve_categories(item["category"] for item in parsed.values())
+
+                existing = {}
+                if self.upsert:
+                    existing = {
+                        name: (product_id, quantity, expiry_date)
+                        for name, product_id, quantity, expiry_date in Product.objects.select_for_update()
+                        .filter(name__in=parsed.keys()).order_by("-id")
+                        .values_list("name", "id", "quantity", "expiry_date")
+                    }
+
+                now = timezone.now()
+                new_products, updated_products = [], []
+                deltas, expiry_changes = {}, {}
+                for item in parsed.values():
+                    product_id, old_quantity, old_expiry = existing.get(item["name"], (None, 0, None))
+                    product = Product(
+                        id=product_id,
+                        name=item["name"],
+                        description=item["description"],
+                        quantity=item["quantity"],
+                        low_stock_threshold=item["low_stock_threshold"],
+                        price=item["price"],
+                        expiry_date=item["expiry_date"],
+                        category_id=self.categories.get(item["category"]),
+                        updated_at=now,
+                    )
+                    (updated_products if product.id else new_products).append(product)
+                    deltas[item["name"]] = item["quantity"] - old_quantity
+                    if product.id and item["expiry_date"] != old_expiry:
+                        expiry_changes[product.id] = item["expiry_date"]
+
+                Product.objects.bulk_create(new_products)
+                self._update_products(updated_products)
+                self._link_suppliers(parsed, new_products + updated_products)
+                # products are written in bulk without signals, so their lots follow here
+                imported = new_products + updated_products
+                lots.set_expiry_dates(expiry_changes)
+                lots.sync_lots({p.id: deltas[p.name] for p in imported}, {p.id: p.expiry_date for p in imported})
+                StockMovement.objects.bulk_create([
+                    StockMovement(
+                        product_id=p.id, change=deltas[p.name], quantity_after=p.quantity,
+                        reason=StockMovement.IMPORT, user=self.user,
+                    )
+                    for p in imported
+                    if deltas[p.name]
+                ])
+        except Exception:
+            self.categories = categories
+            raise
+        return new_products, updated_products
+
+    def _update_products(self, products):
+        # prepared UPDATE per row, see inventory.stock._write_stock_levels for why not bulk_update()
+        if not products:
+            return
+        fields = [Product._meta.get_field(name) for name in UPDATE_FIELDS]
+        assignments = ", ".join(f"{field.column} = %s" for field in fields)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {Product._meta.db_table} SET {assignments} WHERE id = %s",
+                [
+                    [field.get_db_prep_save(getattr(p, field.attname), connection) for field in fields] + [p.id]
+                    for p in products
+                ],
+            )
+
+    def _link_suppliers(self, parsed, products):
+        through = Product.suppliers.through
+        products = [p for p in products if parsed[p.name]["suppliers"] is not None]
+        through.objects.filter(product_id__in=[p.id for p in products]).delete()
+        links = {
+            (p.id, self.suppliers[name])
+            for p in products
+            for name in parsed[p.name]["suppliers"]
+        }
+        if links:
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {through._meta.db_table} (product_id, supplier_id) VALUES (%s, %s)",
+                    sorted(links),
+                )
+
+
+def import_products_csv(text_file, batch_size=IMPORT_BATCH_SIZE, upsert=True, user=None):
+    return ProductImporter(batch_size=batch_size, upsert=upsert, user=user).run(csv.DictReader(text_file))
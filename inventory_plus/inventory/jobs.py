@@ -0,0 +1,139 @@
+import logging
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .retry import retry_on_lock
+
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(seconds=30)
+# a RUNNING job not finished within this long is taken to belong to a crashed worker and is claimed again,
+# so it has to be longer than any task takes
+JOB_LEASE = timedelta(minutes=10)
+
+_executor = None
+
+
+def task(name):
+    """Register a function as a background task under `name`. Its payload is passed as keyword arguments."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def jobs_mode():
+    # "database": a run_jobs worker picks jobs up, "thread": an in-process pool runs them (development)
+    return getattr(settings, "INVENTORY_JOBS_MODE", "database")
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="inventory-jobs")
+    return _executor
+
+
+def _drain_in_thread():
+    close_old_connections()
+    try:
+        while run_pending():
+            pass
+    finally:
+        close_old_connections()
+
+
+def enqueue_many(jobs):
+    """
+    Insert (task, payload, dedupe_key) tuples with one INSERT.
+    Jobs whose dedupe_key is already stored are silently skipped.
+    """
+    rows = [Job(task=name, payload=payload or {}, dedupe_key=dedupe_key) for name, payload, dedupe_key in jobs]
+    if not rows:
+        return
+    Job.objects.bulk_create(rows, ignore_conflicts=True)
+    if jobs_mode() == "thread":
+        transaction.on_commit(lambda: _get_executor().submit(_drain_in_thread))
+
+
+def enqueue(task_name, payload=None, dedupe_key=None):
+    enqueue_many([(task_name, payload, dedupe_key)])
+
+
+def _claimable(now):
+    due = Q(status=Job.PENDING, run_at__lte=now)
+    abandoned = Q(status=Job.RUNNING, updated_at__lt=now - JOB_LEASE)
+    return due | abandoned
+
+
+@retry_on_lock
+def claim_jobs(limit=50):
+    # a conditional UPDATE claims the rows, so concurrent workers never run the same job
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    # abandoned jobs already used up their attempts on the runs that never finished
+    Job.objects.filter(status=Job.RUNNING, updated_at__lt=now - JOB_LEASE, attempts__gte=MAX_ATTEMPTS).update(
+        status=Job.FAILED, last_error="Worker lease expired", updated_at=now
+    )
+    due = Job.objects.filter(_claimable(now)).order_by("run_at", "id")
+    ids = list(due.values_list("id", flat=True)[:limit])
+    if not ids:
+        return []
+    # claimed and read back together, so a retried claim never strands rows under a lost token
+    with transaction.atomic():
+        Job.objects.filter(_claimable(now), pk__in=ids).update(
+            status=Job.RUNNING, locked_by=token, attempts=F("attempts") + 1, updated_at=timezone.now()
+        )
+        return list(Job.objects.filter(locked_by=token, status=Job.RUNNING).order_by("run_at", "id"))
+
+
+def run_job(job):
+    try:
+        func = TASKS[job.task]
+        func(**job.payload)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.pk, job.task)
+        if job.attempts < MAX_ATTEMPTS:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+        else:
+            job.status = Job.FAILED
+        job.last_error = "".join(traceback.format_exception(e))
+        _save_job(job, ["status", "run_at", "last_error", "updated_at"])
+        return False
+
+    job.status = Job.DONE
+    job.last_error = ""
+    _save_job(job, ["status", "last_error", "updated_at"])
+    return True
+
+
+@retry_on_lock
+def _save_job(job, update_fields):
+    # the task already ran, so only the bookkeeping is retried: a lost save would leave the job RUNNING for good
+    job.save(update_fields=update_fields)
+
+
+def run_pending(limit=50):
+    """Run up to `limit` due jobs, returns how many were claimed."""
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+def purge_finished(older_than=timedelta(days=7)):
+    cutoff = timezone.now() - older_than
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], updated_at__lt=cutoff).delete()
+    return deleted
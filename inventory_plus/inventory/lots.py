@@ -0,0 +1,73 @@
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Product, StockLot
+
+# first expired, first out; lots without an expiry date go last, then oldest received first
+FEFO_ORDER = (F("expiry_date").asc(nulls_last=True), "received_at", "id")
+
+
+def refresh_expiry_dates(product_ids):
+    """Set Product.expiry_date to the earliest expiry among each product's non-empty lots, one UPDATE."""
+    next_expiry = (
+        StockLot.objects.active()
+        .filter(product=OuterRef("pk"), expiry_date__isnull=False)
+        .order_by("expiry_date")
+        .values("expiry_date")[:1]
+    )
+    Product.objects.filter(pk__in=list(product_ids)).update(expiry_date=Subquery(next_expiry))
+
+
+def set_expiry_dates(expiry_dates):
+    """
+    Move every open lot of each product {product_id: expiry_date} to that expiry date, one UPDATE per date.
+    For expiry dates edited on the product itself (product form, import), which would otherwise be lost the
+    next time refresh_expiry_dates() derives Product.expiry_date from the lots.
+    """
+    by_date = {}
+    for product_id, expiry_date in expiry_dates.items():
+        by_date.setdefault(expiry_date, []).append(product_id)
+    for expiry_date, product_ids in by_date.items():
+        StockLot.objects.active().filter(product_id__in=product_ids).update(expiry_date=expiry_date)
+
+
+def sync_lots(deltas, expiry_dates=None):
+    """
+    Mirror Product.quantity changes {product_id: delta} onto the lots, inside the caller's transaction.
+
+    Added units become one new lot per product, expiring on expiry_dates[product_id] when given.
+    Removed units are taken first-expired-first-out.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    expiry_dates = expiry_dates or {}
+    now = timezone.now()
+
+    StockLot.objects.bulk_create([
+        StockLot(product_id=product_id, quantity=delta, expiry_date=expiry_dates.get(product_id), received_at=now)
+        for product_id, delta in deltas.items()
+        if delta > 0
+    ])
+
+    remaining = {product_id: -delta for product_id, delta in deltas.items() if delta < 0}
+    if remaining:
+        lots = (
+            StockLot.objects.active()
+            .filter(product_id__in=remaining.keys())
+            .order_by("product_id", *FEFO_ORDER)
+            .values_list("id", "product_id", "quantity")
+        )
+        updates = []
+        for lot_id, product_id, quantity in lots:
+            take = min(quantity, remaining[product_id])
+            if take:
+                updates.append((quantity - take, lot_id))
+                remaining[product_id] -= take
+        if updates:
+            with connection.cursor() as cursor:
+                cursor.executemany(f"UPDATE {StockLot._meta.db_table} SET quantity = %s WHERE id = %s", updates)
+
+    refresh_expiry_dates(deltas.keys())
+
@@ -0,0 +1,106 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from inventory.benchmarks import (
+    default_concurrent_scenarios, default_scenarios, generate_catalog, run_benchmarks, run_concurrent_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a synthetic catalog in a throwaway test database, drive the main views and send_alerts "
+        "through the test client and print latency percentiles and query counts as JSON. With --concurrency, "
+        "also load the pages that have async twins through WSGI threads and the ASGI handler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10000, help="Products to generate (default: 10000).")
+        parser.add_argument("--categories", type=int, default=50, help="Categories to generate (default: 50).")
+        parser.add_argument("--suppliers", type=int, default=200, help="Suppliers to generate (default: 200).")
+        parser.add_argument(
+            "--suppliers-per-product", type=int, default=2, help="Suppliers linked to each product (default: 2)."
+        )
+        parser.add_argument("--sales-per-product", type=int, default=5, help="Sales per product (default: 5).")
+        parser.add_argument("--history-days", type=int, default=180, help="Days of sales history (default: 180).")
+        parser.add_argument("--lots-per-product", type=int, default=3, help="Most stock lots per product (default: 3).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the catalog (default: 0).")
+        parser.add_argument("--iterations", type=int, default=20, help="Timed runs per scenario (default: 20).")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed runs per scenario (default: 2).")
+        parser.add_argument(
+            "--scenario", action="append", dest="scenarios",
+            help="Only run this scenario, may be repeated (default: all).",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=0,
+            help="Clients for the WSGI vs ASGI load comparison (default: 0, skip it).",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per page and path in the load comparison (default: 200)."
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test database and reuse its catalog.")
+
+    def handle(self, *args, **options):
+        scenarios = default_scenarios()
+        if options["scenarios"]:
+            unknown = set(options["scenarios"]) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}. Choose from {', '.join(scenarios)}.")
+            scenarios = {name: scenarios[name] for name in options["scenarios"]}
+
+        catalog = {
+            key: options[key]
+            for key in ("products", "categories", "suppliers", "suppliers_per_product",
+                        "sales_per_product", "history_days", "lots_per_product", "seed")
+        }
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            from inventory.models import Product
+
+            start = time.perf_counter()
+            if not Product.objects.exists():
+                generate_catalog(**catalog, progress=lambda message: self.stderr.write(message))
+            generate_seconds = time.perf_counter() - start
+
+            results = run_benchmarks(scenarios, iterations=options["iterations"], warmup=options["warmup"])
+            concurrent = None
+            if options["concurrency"] > 0:
+                concurrent = run_concurrent_benchmarks(
+                    default_concurrent_scenarios(), concurrency=options["concurrency"],
+                    requests=options["requests"], warmup=options["warmup"],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "catalog": catalog,
+            "catalog_seconds": round(generate_seconds, 3),
+            "iterations": options["iterations"],
+            "warmup": options["warmup"],
+            "scenarios": results,
+        }
+        if concurrent is not None:
+            report["concurrent"] = {
+                "concurrency": options["concurrency"], "requests": options["requests"], "scenarios": concurrent,
+            }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stderr.write(f"Benchmark report written to {options['output']}")
+        else:
+            self.stdout.write(output)
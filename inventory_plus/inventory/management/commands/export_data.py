@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from inventory.exports import (
+    EXPORT_FORMATS, PRODUCT_HEADER, STOCK_STATUS_HEADER, export_lines, product_rows, stock_status_rows,
+)
+from main.exports import SALE_HEADER, sale_rows
+
+
+class Command(BaseCommand):
+    help = "Stream products, sales or stock-status buckets to CSV or JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=["products", "sales", "stock-status"])
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="Output format (default: csv).")
+        parser.add_argument("--output", help="File to write to (default: stdout).")
+        parser.add_argument(
+            "--expiring-days",
+            type=int,
+            default=30,
+            help="Window for the expiring-soon bucket of the stock-status export (default: 30).",
+        )
+
+    def handle(self, *args, **options):
+        dataset = options["dataset"]
+        if dataset == "products":
+            header, rows = PRODUCT_HEADER, product_rows()
+        elif dataset == "sales":
+            header, rows = SALE_HEADER, sale_rows()
+        else:
+            header, rows = STOCK_STATUS_HEADER, stock_status_rows(options["expiring_days"])
+
+        output = open(options["output"], "w", encoding="utf-8", newline="") if options["output"] else sys.stdout
+        try:
+            for line in export_lines(header, rows, options["format"]):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from PIL import UnidentifiedImageError
+
+from inventory.thumbnails import IMAGE_FIELDS, generate_thumbnails, record_hash
+
+
+def _render(name):
+    try:
+        return name, generate_thumbnails(name), None
+    except (OSError, UnidentifiedImageError) as e:
+        return name, None, str(e)
+
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnails for existing product images and supplier logos in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Worker processes rendering thumbnails (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Also re-check images that already have thumbnails, e.g. after THUMBNAIL_SIZES changed.",
+        )
+
+    def handle(self, *args, **options):
+        # each distinct file is rendered once, however many rows share it (the default images mostly)
+        names = {}
+        for label, (field_name, hash_name) in IMAGE_FIELDS.items():
+            rows = apps.get_model(label).objects.exclude(**{field_name: ""})
+            if not options["all"]:
+                rows = rows.filter(**{hash_name: ""})
+            for name in rows.values_list(field_name, flat=True).distinct():
+                names.setdefault(name, set()).add(label)
+
+        if not names:
+            self.stdout.write("Nothing to do.")
+            return
+        self.stdout.write(f"Rendering thumbnails for {len(names)} images with {options['workers']} workers")
+
+        updated = failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=django.setup) as pool:
+            futures = [pool.submit(_render, name) for name in names]
+            for future in as_completed(futures):
+                name, digest, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                    continue
+                # hashes are written here, in the parent, so the workers never touch the database
+                for label in names[name]:
+                    updated += record_hash(label, name, digest)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Thumbnails ready for {len(names) - failed} images ({updated} rows updated), {failed} failed."
+        ))
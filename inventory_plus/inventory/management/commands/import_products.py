@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import IMPORT_BATCH_SIZE, import_products_csv
+
+
+class Command(BaseCommand):
+    help = "Import products from a CSV file (name, description, quantity, low_stock_threshold, price, expiry_date, category, suppliers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Path to the CSV file.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f"Rows written per transaction (default: {IMPORT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--no-upsert",
+            action="store_true",
+            help="Always create new products instead of updating products with the same name.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            csv_file = open(options["csv_path"], encoding="utf-8-sig", newline="")
+        except OSError as e:
+            raise CommandError(f"Cannot open {options['csv_path']}: {e}")
+
+        with csv_file:
+            report = import_products_csv(csv_file, batch_size=options["batch_size"], upsert=not options["no_upsert"])
+
+        for error in report.errors:
+            self.stdout.write(self.style.ERROR(f"Row {error['row']}: {error['message']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created: {report.created}, Updated: {report.updated}, Failed: {report.failed}"
+        ))
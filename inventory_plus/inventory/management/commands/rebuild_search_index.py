@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from inventory.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from the Product, Category and Supplier tables."
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
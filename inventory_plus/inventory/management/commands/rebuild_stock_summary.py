@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from inventory.summary import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = "Recount the dashboard stock counters and top products from the Product table."
+
+    def handle(self, *args, **options):
+        summary = rebuild_summary()
+        self.stdout.write(self.style.SUCCESS(
+            f"Stock summary rebuilt: {summary.total_products} products, "
+            f"{summary.low_stock_count} low stock, {summary.out_of_stock_count} out of stock, "
+            f"{summary.available_count} available."
+        ))
@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from inventory.jobs import purge_finished, run_pending
+from inventory.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (email alerts and other deferred work) and purge expired sync tombstones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run the jobs that are due now and exit.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Jobs claimed per poll (default: 50).")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty (default: 2).")
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=7,
+            help="Delete finished jobs older than this many days (default: 7).",
+        )
+
+    def handle(self, *args, **options):
+        keep = timedelta(days=options["keep_days"])
+        purged = purge_finished(keep)
+        if purged:
+            self.stdout.write(f"Purged {purged} finished jobs")
+        purge_tombstones()
+
+        last_purge = time.monotonic()
+        while True:
+            ran = run_pending(options["batch_size"])
+            if ran:
+                self.stdout.write(self.style.SUCCESS(f"Ran {ran} jobs"))
+                continue
+            if options["once"]:
+                break
+            if time.monotonic() - last_purge > 3600:
+                purge_finished(keep)
+                purge_tombstones()
+                last_purge = time.monotonic()
+            time.sleep(options["sleep"])
@@ -2,12 +2,32 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.conf import settings
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, get_connection
 from django.template.loader import render_to_string
-from django.db.models import F
+from django.db.models import F, OuterRef, Q, Subquery, Sum
 from datetime import timedelta
+from itertools import islice
 
-from inventory.models import Product
+from inventory.models import Product, StockLot
+from inventory.retry import retry_on_lock
+
+
+NOTIFY_INTERVAL = timedelta(hours=24)
+ALERT_FIELDS = ("id", "name", "quantity", "low_stock_threshold", "expiry_date")
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@retry_on_lock
+def stamp_notified(product_ids, field, now):
+    Product.objects.filter(pk__in=product_ids).update(**{field: now})
 
 
 class Command(BaseCommand):
@@ -25,10 +45,22 @@ class Command(BaseCommand):
             action="store_true",
             help="Force sending notifications even if they were sent recently.",
         )
+        parser.add_argument(
+            "--digest",
+            action="store_true",
+            help="Send a single email listing every product instead of one email per product.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Emails sent (and products stamped) per batch (default: 200).",
+        )
 
     def handle(self, *args, **options):
         expiry_days = options["expiry_days"]
         force = options["force"]
+        batch_size = options["batch_size"]
 
         manager_email = getattr(settings, "MANAGER_EMAIL", None) or getattr(settings, "EMAIL_HOST_USER", None)
         if not manager_email:
@@ -36,47 +68,95 @@ class Command(BaseCommand):
             return
 
         now = timezone.now()
-        expiry_threshold_date = timezone.localdate() + timedelta(days=expiry_days)
-
-        # Low stock alerts
-        low_products = Product.objects.filter(quantity__lte=F('low_stock_threshold')).order_by('quantity')
-        low_sent = 0
-        for p in low_products:
-            if force or not p.last_low_stock_notified or (now - p.last_low_stock_notified > timedelta(hours=24)):
-                subject = f"Low stock alert: {p.name}"
-                html_content = render_to_string("inventory/emails/low_stock.html", {"product": p})
-                email = EmailMessage(subject, html_content, settings.EMAIL_HOST_USER, [manager_email])
-                email.content_subtype = "html"
-                try:
-                    email.send()
-                    p.last_low_stock_notified = now
-                    p.save(update_fields=["last_low_stock_notified"])
-                    low_sent += 1
-                    self.stdout.write(self.style.SUCCESS(f"Sent low-stock alert for: {p.name}"))
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Failed to send low-stock alert for {p.name} — {e}"))
-
-        # Expiry alerts
-        expiry_products = Product.objects.filter(
-            expiry_date__isnull=False,
-            expiry_date__lte=expiry_threshold_date
-        ).order_by('expiry_date')
-
-        expiry_sent = 0
-        for p in expiry_products:
-            if force or not p.last_expiry_notified or (now - p.last_expiry_notified > timedelta(hours=24)):
-                days_left = (p.expiry_date - timezone.localdate()).days if p.expiry_date else None
-                subject = f"Expiry alert: {p.name} expires in {days_left} day(s)" if days_left is not None else f"Expiry alert: {p.name}"
-                html_content = render_to_string("inventory/emails/expiry_alert.html", {"product": p, "days_left": days_left})
-                email = EmailMessage(subject, html_content, settings.EMAIL_HOST_USER, [manager_email])
-                email.content_subtype = "html"
-                try:
-                    email.send()
-                    p.last_expiry_notified = now
-                    p.save(update_fields=["last_expiry_notified"])
-                    expiry_sent += 1
-                    self.stdout.write(self.style.SUCCESS(f"Sent expiry alert for: {p.name}"))
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Failed to send expiry alert for {p.name} — {e}"))
+        today = timezone.localdate()
+        expiry_threshold_date = today + timedelta(days=expiry_days)
+        self.from_email = settings.EMAIL_HOST_USER
+        self.to = [manager_email]
+
+        # the 24h throttle lives in the WHERE clause so recently notified rows are never loaded
+        low_products = Product.objects.filter(quantity__lte=F('low_stock_threshold'))
+        # expiry is tracked per lot: a product is due when any non-empty lot is, found through stocklot_expiry_idx alone
+        expiring_lots = StockLot.objects.active().filter(expiry_date__isnull=False, expiry_date__lte=expiry_threshold_date)
+        expiry_products = Product.objects.filter(pk__in=expiring_lots.values("product_id"))
+        if not force:
+            cutoff = now - NOTIFY_INTERVAL
+            low_products = low_products.filter(
+                Q(last_low_stock_notified__isnull=True) | Q(last_low_stock_notified__lt=cutoff)
+            )
+            expiry_products = expiry_products.filter(
+                Q(last_expiry_notified__isnull=True) | Q(last_expiry_notified__lt=cutoff)
+            )
+        low_products = low_products.order_by('quantity').only(*ALERT_FIELDS)
+        expiring_quantity = (
+            expiring_lots.filter(product=OuterRef("pk")).values("product").annotate(total=Sum("quantity")).values("total")
+        )
+        expiry_products = expiry_products.annotate(expiring_quantity=Subquery(expiring_quantity))
+        expiry_products = expiry_products.order_by('expiry_date').only(*ALERT_FIELDS)
+
+        connection = get_connection()
+        with connection:
+            if options["digest"]:
+                low_sent, expiry_sent = self.send_digest(connection, low_products, expiry_products, now, today)
+            else:
+                low_sent = self.send_batches(
+                    connection, low_products, self.low_stock_message, "last_low_stock_notified", now, batch_size, "low-stock"
+                )
+                expiry_sent = self.send_batches(
+                    connection, expiry_products, lambda p: self.expiry_message(p, today),
+                    "last_expiry_notified", now, batch_size, "expiry",
+                )
 
         self.stdout.write(self.style.WARNING(f"Low-stock alerts sent: {low_sent}, Expiry alerts sent: {expiry_sent}"))
+
+    def html_email(self, subject, html_content):
+        email = EmailMessage(subject, html_content, self.from_email, self.to)
+        email.content_subtype = "html"
+        return email
+
+    def low_stock_message(self, p):
+        html_content = render_to_string("inventory/emails/low_stock.html", {"product": p})
+        return self.html_email(f"Low stock alert: {p.name}", html_content)
+
+    def expiry_message(self, p, today):
+        days_left = (p.expiry_date - today).days if p.expiry_date else None
+        subject = f"Expiry alert: {p.name} expires in {days_left} day(s)" if days_left is not None else f"Expiry alert: {p.name}"
+        html_content = render_to_string("inventory/emails/expiry_alert.html", {"product": p, "days_left": days_left})
+        return self.html_email(subject, html_content)
+
+    def send_batches(self, connection, products, build_message, stamp_field, now, batch_size, label):
+        sent = 0
+        for batch in batched(products.iterator(chunk_size=batch_size), batch_size):
+            try:
+                connection.send_messages([build_message(p) for p in batch])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Failed to send a batch of {len(batch)} {label} alerts — {e}"))
+                continue
+            stamp_notified([p.pk for p in batch], stamp_field, now)
+            sent += len(batch)
+            self.stdout.write(self.style.SUCCESS(f"Sent {len(batch)} {label} alerts"))
+        return sent
+
+    def send_digest(self, connection, low_products, expiry_products, now, today):
+        low_products = list(low_products)
+        expiry_products = list(expiry_products)
+        if not low_products and not expiry_products:
+            return 0, 0
+
+        for p in expiry_products:
+            p.days_left = (p.expiry_date - today).days
+        html_content = render_to_string("inventory/emails/digest.html", {
+            "low_products": low_products,
+            "expiry_products": expiry_products,
+        })
+        subject = f"Inventory digest: {len(low_products)} low stock, {len(expiry_products)} expiring"
+        try:
+            connection.send_messages([self.html_email(subject, html_content)])
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Failed to send digest — {e}"))
+            return 0, 0
+
+        for field, products in (("last_low_stock_notified", low_products), ("last_expiry_notified", expiry_products)):
+            for batch in batched((p.pk for p in products), 1000):
+                stamp_notified(batch, field, now)
+        self.stdout.write(self.style.SUCCESS("Sent alert digest"))
+        return len(low_products), len(expiry_products)
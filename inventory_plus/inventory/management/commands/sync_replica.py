@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import caching
+from inventory.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary into the replica file (DB_REPLICA_NAME) with SQLite's online backup, "
+        "so the read_only views can be tried locally. PostgreSQL replicas use streaming replication instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=0,
+            help="Keep copying every this many seconds (default: copy once and exit).",
+        )
+
+    def handle(self, *args, **options):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError("No replica configured, set DB_REPLICA_NAME.")
+        primary, replica = settings.DATABASES["default"], settings.DATABASES[REPLICA]
+        if primary["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("sync_replica only copies SQLite databases.")
+
+        while True:
+            start = time.perf_counter()
+            self.copy(str(primary["NAME"]), str(replica["NAME"]), primary.get("OPTIONS", {}).get("timeout", 5))
+            # cached pages computed from the old copy are dropped, see inventory.caching.versions
+            caching.bump("replica")
+            self.stdout.write(self.style.SUCCESS(f"Replica updated in {time.perf_counter() - start:.2f}s"))
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def copy(self, source_name, target_name, timeout):
+        # one backup step: a consistent snapshot of the primary (WAL readers don't block its writers), written
+        # page by page into the live replica file, so its open connections simply see the new data
+        source = sqlite3.connect(source_name, timeout=timeout)
+        target = sqlite3.connect(target_name, timeout=timeout)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS inventory_product_fts "
+            "USING fts5(name, description, category, suppliers, tokenize='unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(
+            """
+            INSERT INTO inventory_product_fts (rowid, name, description, category, suppliers)
+            SELECT p.id, p.name, p.description, COALESCE(c.name, ''),
+                   COALESCE((SELECT group_concat(s.name, ' ')
+                             FROM inventory_product_suppliers ps
+                             JOIN inventory_supplier s ON s.id = ps.supplier_id
+                             WHERE ps.product_id = p.id), '')
+            FROM inventory_product p
+            LEFT JOIN inventory_category c ON c.id = p.category_id
+            """
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS inventory_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_stocksummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_stockmovement'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('adjustment', 'Adjustment'), ('set', 'Set quantity'), ('stock_take', 'Stock take')], default='adjustment', max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_product_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('adjustment', 'Adjustment'), ('set', 'Set quantity'), ('stock_take', 'Stock take'), ('sale', 'Sale')], default='adjustment', max_length=32),
+        ),
+    ]
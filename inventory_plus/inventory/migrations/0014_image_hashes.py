@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_purchaseorder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='logo_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_opening_lots(apps, schema_editor):
+    # every product with stock starts with one lot carrying its current quantity and expiry date
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO inventory_stocklot (product_id, quantity, expiry_date, received_at)
+            SELECT id, quantity, expiry_date, created_at FROM inventory_product WHERE quantity > 0
+            """
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_image_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expiry_date', models.DateField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('expiry_date__isnull', False), ('quantity__gt', 0)), fields=['expiry_date', 'product', 'quantity'], name='stocklot_expiry_idx'), models.Index(condition=models.Q(('quantity__gt', 0)), fields=['product', 'expiry_date', 'received_at'], name='stocklot_fefo_idx')],
+            },
+        ),
+        migrations.RunPython(create_opening_lots, migrations.RunPython.noop),
+    ]
@@ -13,6 +13,8 @@ class Category(models.Model):
 class Supplier(models.Model):
     name = models.CharField(max_length=256)
     logo = models.ImageField(upload_to="images/suppliers/", default="images/default_supplier.jpg")
+    # content hash of the logo once its thumbnails exist, see inventory/thumbnails.py
+    logo_hash = models.CharField(max_length=32, blank=True, editable=False)
     email = models.EmailField()
     phone = models.CharField(max_length=20)
     website = models.URLField(blank=True)
@@ -21,6 +23,19 @@ class Supplier(models.Model):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+
+    def for_listing(self, suppliers=False):
+        # product cards and report rows: the category name, plus the supplier names where a column shows them
+        queryset = self.select_related("category")
+        if suppliers:
+            queryset = queryset.prefetch_related("suppliers")
+        return queryset
+
+    def for_detail(self):
+        return self.select_related("category").prefetch_related("suppliers")
+
+
 class Product(models.Model):
     name = models.CharField(max_length=512)
     description = models.TextField()
@@ -28,6 +43,7 @@ class Product(models.Model):
     low_stock_threshold = models.PositiveIntegerField(default=5)
     expiry_date = models.DateField(null=True, blank=True)
     image = models.ImageField(upload_to="images/products/", default="images/default_product.jpg")
+    image_hash = models.CharField(max_length=32, blank=True, editable=False)
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True)
     suppliers = models.ManyToManyField('Supplier', blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -37,6 +53,28 @@ class Product(models.Model):
     last_low_stock_notified = models.DateTimeField(blank=True, null=True)
     last_expiry_notified = models.DateTimeField(blank=True, null=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # dashboard top-N ordering and the out-of-stock (quantity = 0) report
+            models.Index(fields=["quantity"], name="product_quantity_idx"),
+            # low-stock reports and alerts: only the rows matching the predicate are indexed
+            models.Index(
+                fields=["quantity"],
+                name="product_low_stock_idx",
+                condition=models.Q(quantity__lte=models.F("low_stock_threshold")),
+            ),
+            # expired / expiring-soon ranges, products without an expiry date are left out
+            models.Index(
+                fields=["expiry_date"],
+                name="product_expiry_idx",
+                condition=models.Q(expiry_date__isnull=False),
+            ),
+            # delta sync cursor: (updated_at, id) > (last seen)
+            models.Index(fields=["updated_at", "id"], name="product_updated_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -50,4 +88,161 @@ class Product(models.Model):
         return delta.days
 
     def get_absolute_url(self):
-        return reverse("inventory:product_detail_view", args=[self.id])
\ No newline at end of file
+        return reverse("inventory:product_detail_view", args=[self.id])
+
+class StockSummary(models.Model):
+    # single-row table holding the dashboard counters, kept up to date by inventory.summary
+    total_products = models.PositiveIntegerField(default=0)
+    low_stock_count = models.PositiveIntegerField(default=0)
+    out_of_stock_count = models.PositiveIntegerField(default=0)
+    available_count = models.PositiveIntegerField(default=0)
+    top_products = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stock summary ({self.total_products} products)"
+
+
+class StockMovement(models.Model):
+    ADJUSTMENT = "adjustment"
+    STOCK_SET = "set"
+    STOCK_TAKE = "stock_take"
+    SALE = "sale"
+    IMPORT = "import"
+    REASON_CHOICES = [
+        (ADJUSTMENT, "Adjustment"),
+        (STOCK_SET, "Set quantity"),
+        (STOCK_TAKE, "Stock take"),
+        (SALE, "Sale"),
+        (IMPORT, "Import"),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_movements")
+    change = models.IntegerField()
+    quantity_after = models.PositiveIntegerField()
+    reason = models.CharField(max_length=32, choices=REASON_CHOICES, default=ADJUSTMENT)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["product", "created_at"])]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.change:+d} -> {self.quantity_after}"
+
+    def save(self, *args, **kwargs):
+        # the ledger is append-only, corrections are recorded as new movements
+        if not self._state.adding:
+            raise ValueError("Stock movements cannot be modified")
+        super().save(*args, **kwargs)
+
+
+class ProductTombstone(models.Model):
+    """Left behind when a product is deleted, so the delta sync can tell devices to drop it."""
+    product_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_idx")]
+
+    def __str__(self):
+        return f"{self.product_id} deleted {self.deleted_at}"
+
+
+class StockLotQuerySet(models.QuerySet):
+
+    def active(self):
+        # emptied lots are kept for their history but left out of both partial indexes
+        return self.filter(quantity__gt=0)
+
+
+class StockLot(models.Model):
+    """
+    A received batch of a product. Product.quantity is the sum of its lots' quantities and
+    Product.expiry_date the earliest expiry among its non-empty lots, both maintained by inventory.stock.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="lots")
+    quantity = models.PositiveIntegerField()
+    expiry_date = models.DateField(null=True, blank=True)
+    received_at = models.DateTimeField(default=timezone.now)
+
+    objects = StockLotQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # expired / expiring-soon ranges; product and quantity ride along so reports and alerts read only the index
+            models.Index(
+                fields=["expiry_date", "product", "quantity"],
+                name="stocklot_expiry_idx",
+                condition=models.Q(quantity__gt=0, expiry_date__isnull=False),
+            ),
+            # first-expired-first-out picking within one product
+            models.Index(
+                fields=["product", "expiry_date", "received_at"],
+                name="stocklot_fefo_idx",
+                condition=models.Q(quantity__gt=0),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity} expiring {self.expiry_date or '-'}"
+
+
+class PurchaseOrder(models.Model):
+    DRAFT = "draft"
+    SENT = "sent"
+    STATUS_CHOICES = [
+        (DRAFT, "Draft"),
+        (SENT, "Sent"),
+    ]
+
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name="purchase_orders")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=DRAFT)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"PO #{self.id} - {self.supplier.name}"
+
+
+class PurchaseOrderLine(models.Model):
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name="lines")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name}"
+
+    @property
+    def total_price(self):
+        return self.unit_price * self.quantity
+
+class Job(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    task = models.CharField(max_length=128)
+    payload = models.JSONField(default=dict, blank=True)
+    # at most one job per key is ever stored, duplicates are dropped when enqueued
+    dedupe_key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
@@ -0,0 +1,110 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over an ordered queryset: every page is a `WHERE (key) > (last key) LIMIT n`,
+    so page 100 costs the same as page 1 and no COUNT is needed.
+
+    `ordering` works like order_by() and must end in a unique, non-null column; "-id" is appended
+    when it doesn't. Cursors are opaque strings that encode the direction and the boundary row's key.
+    """
+
+    def __init__(self, queryset, per_page, ordering=("-id",)):
+        ordering = list(ordering)
+        if ordering[-1].lstrip("-") not in ("id", "pk"):
+            ordering.append("-id" if ordering[0].startswith("-") else "id")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [f.lstrip("-") for f in ordering]
+
+    def encode_cursor(self, direction, obj):
+        values = []
+        for field in self.fields:
+            value = obj[field] if isinstance(obj, dict) else getattr(obj, field)
+            values.append(value if isinstance(value, (int, str)) else str(value))
+        raw = json.dumps([direction, values], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """(direction, key values), or (None, None) for anything malformed so a tampered cursor means page 1."""
+        opts = self.queryset.model._meta
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            direction, values = json.loads(raw)
+            if direction not in ("next", "prev") or len(values) != len(self.fields):
+                return None, None
+            values = [
+                (opts.pk if field == "pk" else opts.get_field(field)).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            return None, None
+        return direction, values
+
+    def _boundary(self, values, backwards):
+        # (a, b) after (x, y)  ==  a > x OR (a = x AND b > y), flipped per column for descending order
+        condition = Q()
+        for i, order in enumerate(self.ordering):
+            descending = order.startswith("-") != backwards
+            lookup = "lt" if descending else "gt"
+            step = Q(**{f"{self.fields[i]}__{lookup}": values[i]})
+            for j in range(i):
+                step &= Q(**{self.fields[j]: values[j]})
+            condition |= step
+        return condition
+
+    def get_page(self, cursor=None):
+        direction, values = self.decode_cursor(cursor) if cursor else (None, None)
+        backwards = direction == "prev"
+
+        ordering = self.ordering
+        if backwards:
+            ordering = [o[1:] if o.startswith("-") else f"-{o}" for o in ordering]
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._boundary(values, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return KeysetPage(rows)
+
+        more_after = has_more if not backwards else True
+        more_before = values is not None if not backwards else has_more
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor("next", rows[-1]) if more_after else None,
+            previous_cursor=self.encode_cursor("prev", rows[0]) if more_before else None,
+        )
@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Min, Q, Sum
+
+from .models import Product, Supplier, PurchaseOrder, PurchaseOrderLine
+from .retry import retry_on_lock
+
+
+LINE_TOTAL = ExpressionWrapper(
+    F("lines__quantity") * F("lines__unit_price"), output_field=DecimalField(max_digits=14, decimal_places=2)
+)
+
+
+def reorder_quantity(product):
+    # bring the product back up to twice its threshold, and always order at least one
+    return max(product.low_stock_threshold * 2 - product.quantity, 1)
+
+
+def group_low_stock_by_supplier():
+    """
+    Low-stock products keyed by supplier, loaded with three queries whatever the catalog size:
+    the products, each product's first supplier (a GROUP BY over the M2M join), and those suppliers.
+    A product with several suppliers is ordered from the one added first (lowest id).
+    Returns (groups, unassigned) where unassigned lists products without any supplier.
+    """
+    low_stock = Q(quantity__lte=F("low_stock_threshold"))
+    products = (
+        Product.objects.filter(low_stock)
+        .only("id", "name", "quantity", "low_stock_threshold", "price")
+        .order_by("name", "id")
+    )
+    first_supplier = dict(
+        Product.suppliers.through.objects.filter(product__in=Product.objects.filter(low_stock))
+        .values("product_id")
+        .annotate(supplier_id=Min("supplier_id"))
+        .values_list("product_id", "supplier_id")
+    )
+    suppliers = Supplier.objects.only("id", "name", "email").in_bulk(set(first_supplier.values()))
+
+    groups = defaultdict(list)
+    unassigned = []
+    for product in products:
+        supplier_id = first_supplier.get(product.id)
+        if supplier_id is None:
+            unassigned.append(product)
+        else:
+            groups[suppliers[supplier_id]].append(product)
+    return groups, unassigned
+
+
+@retry_on_lock
+def generate_purchase_orders():
+    """
+    Replace the current drafts with one draft purchase order per supplier.
+    Uses a fixed number of queries regardless of catalog size.
+    """
+    groups, unassigned = group_low_stock_by_supplier()
+    with transaction.atomic():
+        PurchaseOrder.objects.filter(status=PurchaseOrder.DRAFT).delete()
+        suppliers = sorted(groups, key=lambda s: s.name)
+        orders = PurchaseOrder.objects.bulk_create([PurchaseOrder(supplier=s) for s in suppliers])
+        # one prepared INSERT for every line; bulk_create() would split it at SQLite's parameter limit
+        line_fields = [PurchaseOrderLine._meta.get_field(name) for name in ("order", "product", "quantity", "unit_price")]
+        columns = ", ".join(field.column for field in line_fields)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {PurchaseOrderLine._meta.db_table} ({columns}) VALUES (%s, %s, %s, %s)",
+                [
+                    (order.id, p.id, reorder_quantity(p), line_fields[3].get_db_prep_save(p.price, connection))
+                    for order in orders
+                    for p in groups[order.supplier]
+                ],
+            )
+    return orders, unassigned
+
+
+def purchase_orders_with_totals(status=PurchaseOrder.DRAFT):
+    return (
+        PurchaseOrder.objects.filter(status=status)
+        .select_related("supplier")
+        .annotate(line_count=Count("lines"), total=Sum(LINE_TOTAL), units=Sum("lines__quantity"))
+        .order_by("supplier__name", "id")
+    )
+
+
+PURCHASE_ORDER_HEADER = ["order", "supplier", "supplier_email", "product_id", "product", "quantity", "unit_price", "total"]
+
+
+def purchase_order_rows(status=PurchaseOrder.DRAFT):
+    lines = (
+        PurchaseOrderLine.objects.filter(order__status=status)
+        .order_by("order__supplier__name", "order_id", "product__name")
+        .values_list(
+            "order_id", "order__supplier__name", "order__supplier__email", "product_id", "product__name",
+            "quantity", "unit_price",
+        )
+    )
+    for order_id, supplier, email, product_id, product, quantity, unit_price in lines.iterator(chunk_size=2000):
+        yield [order_id, supplier, email, product_id, product, quantity, unit_price, unit_price * quantity]
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Product, StockLot
+
+
+def stock_status_querysets(expiring_days=30, today=None):
+    """
+    The low-stock, expired and expiring-soon buckets shown by stock_status_view.
+    Low stock lists products; the expiry buckets list the non-empty lots, so a product appears
+    once for every batch that is out of date.
+    """
+    today = today or timezone.localdate()
+    lots = StockLot.objects.active().filter(expiry_date__isnull=False).select_related("product")
+    return {
+        "low_stock": Product.objects.for_listing().filter(quantity__lte=F('low_stock_threshold')).order_by("quantity"),
+        "expired": lots.filter(expiry_date__lt=today).order_by("expiry_date"),
+        "expiring_soon": lots.filter(
+            expiry_date__gte=today,
+            expiry_date__lte=today + timedelta(days=expiring_days)
+        ).order_by("expiry_date"),
+    }
@@ -0,0 +1,49 @@
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+logger = logging.getLogger(__name__)
+
+LOCK_RETRIES = getattr(settings, "DB_LOCK_RETRIES", 5)
+LOCK_RETRY_DELAY = 0.05
+
+# PostgreSQL's serialization_failure, deadlock_detected and lock_not_available
+RETRYABLE_SQLSTATES = {"40001", "40P01", "55P03"}
+
+
+def is_lock_error(error):
+    if "database is locked" in str(error) or "database table is locked" in str(error):
+        return True
+    cause = error.__cause__
+    return (getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)) in RETRYABLE_SQLSTATES
+
+
+def retry_on_lock(func=None, *, retries=None, delay=LOCK_RETRY_DELAY):
+    """
+    Run `func` again when the database reports lock contention, waiting delay, 2*delay, 4*delay...
+    (with jitter, so workers that collided don't collide again) up to `retries` times.
+
+    `func` has to be safe to re-run: it should open its own transaction, so a failed attempt leaves
+    nothing behind. Inside an outer atomic block the whole transaction is what would need
+    re-running, so the error is passed up untouched for the outermost retry_on_lock to handle.
+    """
+    if func is None:
+        return functools.partial(retry_on_lock, retries=retries, delay=delay)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = (LOCK_RETRIES if retries is None else retries) + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == attempts or not is_lock_error(e) or transaction.get_connection().in_atomic_block:
+                    raise
+                wait = delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logger.warning("%s hit a lock (%s), retrying in %.3fs", func.__qualname__, e, wait)
+                time.sleep(wait)
+    return wrapper
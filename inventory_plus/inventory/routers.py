@@ -0,0 +1,111 @@
+import contextvars
+import functools
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+REPLICA = "replica"
+STICKY_COOKIE = "inventory_primary"
+# how far the replica may trail the primary: clients read from the primary for this long after writing
+REPLICA_MAX_LAG = getattr(settings, "DB_REPLICA_MAX_LAG", 10)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+# catalog and sales data; sessions, users and the database cache table always come from the primary
+REPLICA_APPS = {"inventory", "main"}
+
+_use_replica = contextvars.ContextVar("use_replica", default=False)
+
+
+def replica_configured():
+    if REPLICA not in settings.DATABASES:
+        return False
+    primary, replica = connections["default"].settings_dict, connections[REPLICA].settings_dict
+    # an alias pointing at the primary's own database is no replica: test runs mirror it that way
+    return (replica["NAME"], replica.get("HOST")) != (primary["NAME"], primary.get("HOST"))
+
+
+def reading_from_replica():
+    return _use_replica.get() and replica_configured()
+
+
+class PrimaryReplicaRouter:
+    """Reads inside read_only views go to the replica, everything else (and every write) to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if reading_from_replica() and model._meta.app_label in REPLICA_APPS:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default" if replica_configured() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # same rows on both sides, a product read from the replica may point at a category from the primary
+        if {obj1._state.db, obj2._state.db} <= {"default", REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema along with the data, see `manage.py sync_replica`
+        return False if db == REPLICA else None
+
+
+def _on_replica(chunks):
+    # streamed responses run their queries after the view returned, one chunk at a time
+    chunks = iter(chunks)
+    while True:
+        token = _use_replica.set(True)
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            _use_replica.reset(token)
+        yield chunk
+
+
+def _route_stream(response):
+    if _use_replica.get() and getattr(response, "streaming", False) and not response.is_async:
+        response.streaming_content = _on_replica(response.streaming_content)
+    return response
+
+
+def read_only(view):
+    """
+    Send the view's queries to the replica, unless this client wrote something within the last
+    REPLICA_MAX_LAG seconds (see StickyPrimaryMiddleware) and must see its own changes.
+    Put it closest to the view: the session and user lookups of the outer decorators stay on the primary.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            token = _use_replica.set(STICKY_COOKIE not in request.COOKIES)
+            try:
+                return _route_stream(await view(request, *args, **kwargs))
+            finally:
+                _use_replica.reset(token)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _use_replica.set(STICKY_COOKIE not in request.COOKIES)
+            try:
+                return _route_stream(view(request, *args, **kwargs))
+            finally:
+                _use_replica.reset(token)
+    return wrapper
+
+
+class StickyPrimaryMiddleware:
+    """After a successful write request, keep the client on the primary for REPLICA_MAX_LAG seconds."""
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(STICKY_COOKIE, "1", max_age=REPLICA_MAX_LAG, httponly=True, samesite="Lax")
+        return response
@@ -0,0 +1,144 @@
+import re
+
+from django.db import connection, connections, router
+from django.db.models import Q
+
+from .models import Product
+
+
+FTS_TABLE = "inventory_product_fts"
+TOKEN_RE = re.compile(r"\w+")
+INDEX_CHUNK_SIZE = 500
+
+# bm25 weights for the name, description, category and suppliers columns
+RANK_EXPRESSION = f"bm25({FTS_TABLE}, 10.0, 1.0, 4.0, 4.0)"
+
+# one row per product, used for rebuilds and incremental updates (see also migration 0007)
+DOCUMENT_SQL = """
+    SELECT p.id, p.name, p.description, COALESCE(c.name, ''),
+           COALESCE((SELECT group_concat(s.name, ' ')
+                     FROM inventory_product_suppliers ps
+                     JOIN inventory_supplier s ON s.id = ps.supplier_id
+                     WHERE ps.product_id = p.id), '')
+    FROM inventory_product p
+    LEFT JOIN inventory_category c ON c.id = p.category_id
+"""
+
+
+def build_match_query(query):
+    # every word must match, each one as a prefix: "choc milk" -> "choc"* "milk"*
+    tokens = TOKEN_RE.findall(query.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), INDEX_CHUNK_SIZE):
+        yield ids[start:start + INDEX_CHUNK_SIZE]
+
+
+class FTS5Results:
+    """Lazy ranked result set, sliceable and countable so it can be fed to a Paginator."""
+
+    def __init__(self, match):
+        self.match = match
+
+    def _cursor(self):
+        # raw SQL skips the router, so pick the connection the ORM would read products from
+        return connections[router.db_for_read(Product)].cursor()
+
+    def count(self):
+        with self._cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [self.match])
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, page):
+        offset = page.start or 0
+        limit = page.stop - offset
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY {RANK_EXPRESSION} LIMIT %s OFFSET %s",
+                [self.match, limit, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        products = Product.objects.for_listing().in_bulk(ids)
+        return [products[product_id] for product_id in ids if product_id in products]
+
+
+class FTS5SearchBackend:
+    """SQLite FTS5 index kept in sync by the signals in inventory.signals."""
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, name, description, category, suppliers) {DOCUMENT_SQL}")
+
+    def index_products(self, product_ids):
+        with connection.cursor() as cursor:
+            for chunk in _chunks(product_ids):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, name, description, category, suppliers) "
+                    f"{DOCUMENT_SQL} WHERE p.id IN ({placeholders})",
+                    chunk,
+                )
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            for chunk in _chunks(product_ids):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+    def search(self, query):
+        match = build_match_query(query)
+        if not match:
+            return Product.objects.none()
+        return FTS5Results(match)
+
+
+class DatabaseSearchBackend:
+    """Fallback for databases without FTS5: the original icontains lookups, nothing to maintain."""
+
+    def rebuild(self):
+        pass
+
+    def index_products(self, product_ids):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def search(self, query):
+        return Product.objects.for_listing().filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__name__icontains=query) |
+            Q(suppliers__name__icontains=query)
+        ).distinct().order_by("name", "id")
+
+
+def get_backend(conn=None):
+    conn = conn or connection
+    if conn.vendor == "sqlite":
+        return FTS5SearchBackend()
+    return DatabaseSearchBackend()
+
+
+def search_products(query):
+    return get_backend().search(query)
+
+
+def index_products(product_ids):
+    if product_ids:
+        get_backend().index_products(product_ids)
+
+
+def remove_products(product_ids):
+    if product_ids:
+        get_backend().remove_products(product_ids)
+
+
+def rebuild_index():
+    get_backend().rebuild()
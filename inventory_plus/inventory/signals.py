@@ -0,0 +1,165 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver, Signal
+
+from .models import Product, Category, Supplier, ProductTombstone
+from . import caching, lots, search, summary
+
+
+# sent by inventory.stock after set-based stock updates, with changes=[(before, after), ...] StockState pairs
+stock_changed = Signal()
+
+SUMMARY_FIELDS = {"name", "quantity", "low_stock_threshold"}
+LOT_FIELDS = {"quantity", "expiry_date"}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(pre_save, sender=Product)
+def remember_stock_state(sender, instance, raw, update_fields, **kwargs):
+    instance._stock_state_before = None
+    instance._lot_state_before = None
+    if raw or instance.pk is None:
+        return
+    touches_summary = _touches(update_fields, SUMMARY_FIELDS)
+    touches_lots = _touches(update_fields, LOT_FIELDS)
+    if not (touches_summary or touches_lots):
+        return
+    row = Product.objects.filter(pk=instance.pk).values_list(
+        "id", "name", "quantity", "low_stock_threshold", "expiry_date"
+    ).first()
+    if row is None:
+        return
+    if touches_summary:
+        instance._stock_state_before = summary.StockState(*row[:4])
+    if touches_lots:
+        instance._lot_state_before = (row[2], row[4])
+
+
+@receiver(post_save, sender=Product)
+def update_summary_on_save(sender, instance, created, raw, update_fields, **kwargs):
+    if raw or not _touches(update_fields, SUMMARY_FIELDS):
+        return
+    before = None if created else getattr(instance, "_stock_state_before", None)
+    summary.record_changes([(before, summary.product_state(instance))])
+
+
+@receiver(post_save, sender=Product)
+def sync_lots_on_save(sender, instance, created, raw, update_fields, **kwargs):
+    # quantities typed into the product forms go through save(), the stock service keeps the lots itself
+    if raw:
+        return
+    if created:
+        lots.sync_lots({instance.pk: int(instance.quantity)}, {instance.pk: instance.expiry_date})
+        return
+    before = getattr(instance, "_lot_state_before", None)
+    if before is None:
+        return
+    quantity_before, expiry_date_before = before
+    if _touches(update_fields, {"expiry_date"}):
+        # an expiry date typed into the form applies to the stock on hand, which lives in the lots
+        expiry_date = Product._meta.get_field("expiry_date").to_python(instance.expiry_date)
+        if expiry_date != expiry_date_before:
+            lots.set_expiry_dates({instance.pk: expiry_date})
+    if _touches(update_fields, {"quantity"}):
+        delta = int(instance.quantity) - quantity_before
+        lots.sync_lots({instance.pk: delta}, {instance.pk: instance.expiry_date})
+
+
+@receiver(post_delete, sender=Product)
+def update_summary_on_delete(sender, instance, **kwargs):
+    summary.record_changes([(summary.product_state(instance), None)])
+
+
+@receiver(post_delete, sender=Product)
+def record_tombstone(sender, instance, **kwargs):
+    # handheld devices learn about deletes from these, see inventory.sync
+    ProductTombstone.objects.create(product_id=instance.pk)
+
+
+@receiver(stock_changed)
+def update_summary_on_stock_change(sender, changes, **kwargs):
+    summary.record_changes(changes)
+
+
+# ---- search index ----
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, raw, **kwargs):
+    if not raw:
+        search.index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw, **kwargs):
+    if not raw and not created:
+        search.index_products(Product.objects.filter(category=instance).values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Supplier)
+def reindex_supplier_products(sender, instance, created, raw, **kwargs):
+    if not raw and not created:
+        search.index_products(Product.objects.filter(suppliers=instance).values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Supplier)
+def remember_indexed_products(sender, instance, **kwargs):
+    # the category FK is nulled and supplier links are dropped without signals, so collect the ids first
+    related = Product.objects.filter(category=instance) if sender is Category else Product.objects.filter(suppliers=instance)
+    instance._search_product_ids = list(related.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Supplier)
+def reindex_after_related_delete(sender, instance, **kwargs):
+    search.index_products(getattr(instance, "_search_product_ids", []))
+
+
+@receiver(m2m_changed, sender=Product.suppliers.through)
+def reindex_on_supplier_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._search_product_ids = list(instance.product_set.values_list("id", flat=True))
+    elif action in ("post_add", "post_remove"):
+        search.index_products([instance.pk] if not reverse else pk_set)
+    elif action == "post_clear":
+        search.index_products([instance.pk] if not reverse else getattr(instance, "_search_product_ids", []))
+
+
+# ---- cache versions ----
+# product pages key on the product's own version plus the category and supplier list versions,
+# so renaming or deleting a category or supplier (SET_NULL / link removal run without signals) is covered too
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_version(sender, instance, **kwargs):
+    caching.bump_products([instance.pk])
+
+
+@receiver(stock_changed)
+def bump_versions_on_stock_change(sender, changes, **kwargs):
+    caching.bump_products({state.id for pair in changes for state in pair if state is not None})
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, **kwargs):
+    caching.bump("categories")
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def bump_supplier_version(sender, **kwargs):
+    caching.bump("suppliers")
+
+
+@receiver(m2m_changed, sender=Product.suppliers.through)
+def bump_versions_on_supplier_links(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        caching.bump("products", "suppliers")
@@ -0,0 +1,310 @@
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import Product, StockMovement
+from .signals import stock_changed
+from .lots import sync_lots
+from .retry import retry_on_lock
+from .summary import StockState
+
+
+BULK_BATCH_SIZE = 1000
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+def _notify(changes):
+    # queryset.update() skips the model signals, so tell the summary (and friends) directly
+    stock_changed.send(sender=Product, changes=changes)
+
+
+def _locked_state(product_id):
+    row = (
+        Product.objects.select_for_update()
+        .filter(pk=product_id)
+        .values_list("id", "name", "quantity", "low_stock_threshold")
+        .get()
+    )
+    return StockState(*row)
+
+
+@retry_on_lock
+def adjust_stock(product_id, delta, user=None, reason=StockMovement.ADJUSTMENT, expiry_date=None):
+    """
+    Add `delta` units (negative to remove) with a single conditional UPDATE.
+    Raises InsufficientStock instead of letting the quantity drop below zero.
+    Added units are booked as a new lot expiring on `expiry_date`, removed ones come out of the
+    lots first-expired-first-out.
+    """
+    if delta == 0:
+        return None
+
+    with transaction.atomic():
+        updated = Product.objects.filter(pk=product_id, quantity__gte=max(0, -delta)).update(
+            quantity=F("quantity") + delta,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            if not Product.objects.filter(pk=product_id).exists():
+                raise Product.DoesNotExist(f"Product {product_id} does not exist")
+            raise InsufficientStock(f"Not enough stock for product {product_id} to remove {-delta} units")
+        sync_lots({product_id: delta}, {product_id: expiry_date})
+
+        after = StockState(*Product.objects.filter(pk=product_id).values_list(
+            "id", "name", "quantity", "low_stock_threshold"
+        ).get())
+        movement = StockMovement.objects.create(
+            product_id=product_id, change=delta, quantity_after=after.quantity, reason=reason, user=user
+        )
+        _notify([(after._replace(quantity=after.quantity - delta), after)])
+    return movement
+
+
+@retry_on_lock
+def remove_stock_many(quantities, user=None, reason=StockMovement.SALE):
+    """
+    Remove {product_id: units} for several products with one guarded UPDATE.
+    Raises InsufficientStock (and writes nothing) unless every product has enough stock.
+    Returns the StockState of each product after the update.
+    """
+    if not quantities:
+        return {}
+    needed = Case(
+        *[When(pk=product_id, then=Value(units)) for product_id, units in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+    with transaction.atomic():
+        updated = Product.objects.filter(pk__in=quantities.keys(), quantity__gte=needed).update(
+            quantity=F("quantity") - needed,
+            updated_at=timezone.now(),
+        )
+        if updated != len(quantities):
+            raise InsufficientStock("Not enough stock for one or more products")
+        sync_lots({product_id: -units for product_id, units in quantities.items()})
+
+        after = {
+            row[0]: StockState(*row)
+            for row in Product.objects.filter(pk__in=quantities.keys()).values_list(
+                "id", "name", "quantity", "low_stock_threshold"
+            )
+        }
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                product_id=product_id, change=-units, quantity_after=after[product_id].quantity,
+                reason=reason, user=user,
+            )
+            for product_id, units in quantities.items()
+        ])
+        _notify([
+            (after[product_id]._replace(quantity=after[product_id].quantity + units), after[product_id])
+            for product_id, units in quantities.items()
+        ])
+    return after
+
+
+@retry_on_lock
+def set_stock(product_id, quantity, user=None, reason=StockMovement.STOCK_SET):
+    if quantity < 0:
+        raise ValueError("Quantity cannot be negative")
+
+    with transaction.atomic():
+        before = _locked_state(product_id)
+        if before.quantity == quantity:
+            return None
+        Product.objects.filter(pk=product_id).update(quantity=quantity, updated_at=timezone.now())
+        sync_lots({product_id: quantity - before.quantity})
+        movement = StockMovement.objects.create(
+            product_id=product_id,
+            change=quantity - before.quantity,
+            quantity_after=quantity,
+            reason=reason,
+            user=user,
+        )
+        _notify([(before, before._replace(quantity=quantity))])
+    return movement
+
+
+@retry_on_lock
+def set_low_stock_threshold(product_id, threshold):
+    if threshold < 0:
+        raise ValueError("Low stock threshold cannot be negative")
+
+    with transaction.atomic():
+        before = _locked_state(product_id)
+        if before.low_stock_threshold == threshold:
+            return
+        Product.objects.filter(pk=product_id).update(low_stock_threshold=threshold, updated_at=timezone.now())
+        _notify([(before, before._replace(low_stock_threshold=threshold))])
+
+
+@retry_on_lock
+def update_stock(product_id, set_quantity=None, change_by=None, low_stock_threshold=None, user=None, expiry_date=None):
+    """
+    Set the quantity, then add change_by, then set the threshold (each optional) as one transaction,
+    so a step that fails (InsufficientStock, ValueError) undoes the ones before it.
+    """
+    with transaction.atomic():
+        if set_quantity is not None:
+            set_stock(product_id, set_quantity, user=user)
+        if change_by is not None:
+            adjust_stock(product_id, change_by, user=user, expiry_date=expiry_date)
+        if low_stock_threshold is not None:
+            set_low_stock_threshold(product_id, low_stock_threshold)
+
+
+def _parse_count(value, field):
+    if value is None or str(value).strip() == "":
+        return None
+    number = int(str(value).strip())
+    if field != "change_by" and number < 0:
+        raise ValueError(f"{field} cannot be negative")
+    return number
+
+
+def _parse_row(number, row):
+    key = row.get("product") or row.get("product_id") or row.get("name") or ""
+    key = str(key).strip()
+    if not key:
+        raise ValueError("missing product id or name")
+    return {
+        "row": number,
+        "product": key,
+        "set_quantity": _parse_count(row.get("set_quantity"), "set_quantity"),
+        "change_by": _parse_count(row.get("change_by"), "change_by"),
+        "low_stock_threshold": _parse_count(row.get("low_stock_threshold"), "low_stock_threshold"),
+    }
+
+
+def set_low_stock_thresholds(thresholds, batch_size=BULK_BATCH_SIZE):
+    """Set {product_id: threshold} for many products, one SELECT and one prepared UPDATE per batch."""
+    items = list(thresholds.items())
+    for start in range(0, len(items), batch_size):
+        _set_threshold_batch(dict(items[start:start + batch_size]))
+
+
+@retry_on_lock
+def _set_threshold_batch(batch):
+    with transaction.atomic():
+        before = [
+            StockState(*row)
+            for row in Product.objects.select_for_update().filter(pk__in=batch.keys()).values_list(
+                "id", "name", "quantity", "low_stock_threshold"
+            )
+        ]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {Product._meta.db_table} SET low_stock_threshold = %s, updated_at = %s WHERE id = %s",
+                [(batch[state.id], now, state.id) for state in before],
+            )
+        _notify([(state, state._replace(low_stock_threshold=batch[state.id])) for state in before])
+
+
+def _write_stock_levels(products):
+    # bulk_update() builds a CASE per column that costs more to compile than to run,
+    # a prepared UPDATE executed once per row keeps the batch in the database driver
+    if not products:
+        return
+    table = Product._meta.db_table
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET quantity = %s, low_stock_threshold = %s, updated_at = %s WHERE id = %s",
+            [(p.quantity, p.low_stock_threshold, now, p.id) for p in products],
+        )
+
+
+@retry_on_lock
+def _apply_batch(batch, user):
+    results = []
+    parsed = []
+    for number, row in batch:
+        try:
+            parsed.append(_parse_row(number, row))
+        except ValueError as e:
+            results.append({"row": number, "product": row.get("product", ""), "status": "error", "message": str(e)})
+
+    ids = {int(item["product"]) for item in parsed if item["product"].isdigit()}
+    names = {item["product"] for item in parsed if not item["product"].isdigit()}
+    movements = []
+
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update()
+            .filter(Q(pk__in=ids) | Q(name__in=names))
+            .only("id", "name", "quantity", "low_stock_threshold")
+        )
+        by_id = {p.id: p for p in products}
+        by_name = {}
+        for p in products:
+            by_name.setdefault(p.name, []).append(p)
+        before = {p.id: StockState(p.id, p.name, p.quantity, p.low_stock_threshold) for p in products}
+
+        for item in parsed:
+            if item["product"].isdigit():
+                product = by_id.get(int(item["product"]))
+            else:
+                matches = by_name.get(item["product"], [])
+                if len(matches) > 1:
+                    results.append({**item, "status": "error", "message": "product name is ambiguous, use the id"})
+                    continue
+                product = matches[0] if matches else None
+            if product is None:
+                results.append({**item, "status": "error", "message": "product not found"})
+                continue
+
+            quantity = product.quantity
+            if item["set_quantity"] is not None:
+                quantity = item["set_quantity"]
+            if item["change_by"] is not None:
+                quantity += item["change_by"]
+            if quantity < 0:
+                results.append({**item, "status": "error", "message": "not enough stock"})
+                continue
+
+            if quantity != product.quantity:
+                movements.append(StockMovement(
+                    product_id=product.id,
+                    change=quantity - product.quantity,
+                    quantity_after=quantity,
+                    reason=StockMovement.STOCK_TAKE,
+                    user=user,
+                ))
+                product.quantity = quantity
+            if item["low_stock_threshold"] is not None:
+                product.low_stock_threshold = item["low_stock_threshold"]
+            results.append({**item, "status": "ok", "quantity": product.quantity})
+
+        changed = [
+            p for p in products
+            if (p.quantity, p.low_stock_threshold) != (before[p.id].quantity, before[p.id].low_stock_threshold)
+        ]
+        _write_stock_levels(changed)
+        sync_lots({p.id: p.quantity - before[p.id].quantity for p in changed})
+        StockMovement.objects.bulk_create(movements)
+        if changed:
+            _notify([(before[p.id], before[p.id]._replace(quantity=p.quantity, low_stock_threshold=p.low_stock_threshold)) for p in changed])
+
+    return sorted(results, key=lambda result: result["row"])
+
+
+def apply_stock_rows(rows, user=None, batch_size=BULK_BATCH_SIZE):
+    """
+    Apply stock-take rows (dicts with product, set_quantity, change_by, low_stock_threshold)
+    in batches: one locking SELECT, one bulk UPDATE and one ledger INSERT per batch.
+    Returns a per-row report; bad rows are reported and skipped, they don't abort the batch.
+    """
+    numbered = enumerate(rows, start=1)
+    results = []
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+        results.extend(_apply_batch(batch, user))
+    return results
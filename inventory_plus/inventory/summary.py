@@ -0,0 +1,91 @@
+from collections import namedtuple
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Product, StockSummary
+
+
+SUMMARY_ID = 1
+TOP_PRODUCTS_LIMIT = 5
+COUNTER_FIELDS = ("total_products", "low_stock_count", "out_of_stock_count", "available_count")
+
+# the part of a product the dashboard counters depend on
+StockState = namedtuple("StockState", ["id", "name", "quantity", "low_stock_threshold"])
+
+
+def product_state(product):
+    return StockState(product.pk, product.name, int(product.quantity), int(product.low_stock_threshold))
+
+
+def bucket_counts(state):
+    # same buckets all_products_view used to count with separate queries
+    return {
+        "total_products": 1,
+        "low_stock_count": int(0 < state.quantity < state.low_stock_threshold),
+        "out_of_stock_count": int(state.quantity == 0),
+        "available_count": int(state.quantity >= state.low_stock_threshold),
+    }
+
+
+def _top_products():
+    rows = Product.objects.order_by("-quantity", "-id").values("id", "name", "quantity")[:TOP_PRODUCTS_LIMIT]
+    return list(rows)
+
+
+def rebuild_summary():
+    counts = Product.objects.aggregate(
+        total_products=Count("id"),
+        low_stock_count=Count("id", filter=Q(quantity__lt=F("low_stock_threshold"), quantity__gt=0)),
+        out_of_stock_count=Count("id", filter=Q(quantity=0)),
+        available_count=Count("id", filter=Q(quantity__gte=F("low_stock_threshold"))),
+    )
+    summary, _ = StockSummary.objects.update_or_create(
+        pk=SUMMARY_ID,
+        defaults={**counts, "top_products": _top_products()},
+    )
+    return summary
+
+
+def get_summary():
+    summary = StockSummary.objects.filter(pk=SUMMARY_ID).first()
+    if summary is None:
+        summary = rebuild_summary()
+    return summary
+
+
+def record_changes(changes):
+    """
+    Apply (before, after) StockState pairs to the summary row.
+    `before` is None for new products and `after` is None for deleted ones.
+    """
+    summary = StockSummary.objects.filter(pk=SUMMARY_ID).first()
+    if summary is None:
+        # first write ever: counting from scratch already includes this change
+        rebuild_summary()
+        return
+
+    top = summary.top_products
+    top_ids = {row["id"] for row in top}
+    top_floor = min(row["quantity"] for row in top) if len(top) >= TOP_PRODUCTS_LIMIT else None
+
+    deltas = dict.fromkeys(COUNTER_FIELDS, 0)
+    refresh_top = False
+    for before, after in changes:
+        if before is not None:
+            for field, value in bucket_counts(before).items():
+                deltas[field] -= value
+        if after is not None:
+            for field, value in bucket_counts(after).items():
+                deltas[field] += value
+
+        product_id = (before or after).id
+        if product_id in top_ids or (after is not None and (top_floor is None or after.quantity >= top_floor)):
+            refresh_top = True
+
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if refresh_top:
+        updates["top_products"] = _top_products()
+    if updates:
+        updates["updated_at"] = timezone.now()
+        StockSummary.objects.filter(pk=SUMMARY_ID).update(**updates)
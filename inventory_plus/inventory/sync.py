@@ -0,0 +1,110 @@
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Product, ProductTombstone
+
+SYNC_FIELDS = ["id", "name", "price", "quantity", "low_stock_threshold", "expiry_date", "category_id"]
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 5000
+# rows stamped by a transaction that commits after a device already read past that timestamp would be
+# skipped for good, so a page never reaches closer to now than this
+SYNC_SETTLE = timedelta(seconds=5)
+TOMBSTONE_RETENTION = timedelta(days=getattr(settings, "SYNC_TOMBSTONE_DAYS", 90))
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _micros(value):
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value):
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def encode_cursor(product_pos, tombstone_pos):
+    """Both streams' (timestamp, id) positions as four integers, base64 so devices treat it as opaque."""
+    raw = ".".join(str(n) for n in (*product_pos, *tombstone_pos)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        product_ts, product_id, tombstone_ts, tombstone_id = (int(n) for n in raw.split("."))
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(f"invalid sync cursor {cursor!r}")
+    return (product_ts, product_id), (tombstone_ts, tombstone_id)
+
+
+def _after(field, position):
+    ts, row_id = _from_micros(position[0]), position[1]
+    return Q(**{f"{field}__gt": ts}) | Q(**{field: ts, "id__gt": row_id})
+
+
+def changes_since(cursor=None, limit=SYNC_PAGE_SIZE, now=None):
+    """
+    One page of the product delta feed.
+
+    Without a cursor the page starts a full download (no tombstones needed). With one it holds the
+    products created or updated and the ids deleted since that cursor, both in (timestamp, id) order.
+    Devices apply `deleted` before `products`, store `cursor` and ask again while `more` is true.
+    `full_resync` is set when deletes past the cursor may already have been purged.
+    """
+    now = now or timezone.now()
+    until = now - SYNC_SETTLE
+    limit = max(1, min(limit, SYNC_MAX_PAGE_SIZE))
+    if cursor:
+        product_pos, tombstone_pos = decode_cursor(cursor)
+    else:
+        # a full download only needs the deletes that happen while and after it runs
+        product_pos, tombstone_pos = (0, 0), (_micros(until), 0)
+
+    if tombstone_pos[0] < _micros(now - TOMBSTONE_RETENTION):
+        return {"full_resync": True, "cursor": None, "more": False, "fields": SYNC_FIELDS, "products": [], "deleted": []}
+
+    products = list(
+        Product.objects.filter(_after("updated_at", product_pos), updated_at__lte=until)
+        .order_by("updated_at", "id")
+        .values_list(*SYNC_FIELDS, "updated_at")[:limit + 1]
+    )
+    tombstones = list(
+        ProductTombstone.objects.filter(_after("deleted_at", tombstone_pos), deleted_at__lte=until)
+        .order_by("deleted_at", "id")
+        .values_list("id", "product_id", "deleted_at")[:limit + 1]
+    )
+    more = len(products) > limit or len(tombstones) > limit
+    products, tombstones = products[:limit], tombstones[:limit]
+    if products:
+        product_pos = (_micros(products[-1][-1]), products[-1][0])
+    if tombstones:
+        tombstone_pos = (_micros(tombstones[-1][2]), tombstones[-1][0])
+    if len(tombstones) < limit:
+        # every delete up to `until` has been handed out; moving on keeps quiet devices inside the retention window
+        tombstone_pos = max(tombstone_pos, (_micros(until), 0))
+
+    return {
+        "full_resync": False,
+        "cursor": encode_cursor(product_pos, tombstone_pos),
+        "more": more,
+        "fields": SYNC_FIELDS,
+        "products": [
+            [pk, name, str(price), quantity, threshold, expiry and expiry.isoformat(), category_id]
+            for pk, name, price, quantity, threshold, expiry, category_id, _ in products
+        ],
+        "deleted": [product_id for _, product_id, _ in tombstones],
+    }
+
+
+def purge_tombstones(older_than=TOMBSTONE_RETENTION):
+    deleted, _ = ProductTombstone.objects.filter(deleted_at__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -0,0 +1,42 @@
+from django.utils import timezone
+
+from .jobs import enqueue, enqueue_many, task
+from .models import Product
+from . import thumbnails, utils
+
+
+@task("send_low_stock_email")
+def send_low_stock_email_task(product_id):
+    product = Product.objects.filter(pk=product_id).first()
+    if product is not None:
+        utils.send_low_stock_email(product)
+
+
+@task("send_stock_alert")
+def send_stock_alert_task(product_id, alert_type):
+    product = Product.objects.filter(pk=product_id).first()
+    if product is not None:
+        utils.deliver_stock_alert(product, alert_type)
+
+
+def queue_low_stock_emails(products):
+    # one alert per product per day, however often the report is opened
+    today = timezone.localdate().isoformat()
+    enqueue_many(
+        ("send_low_stock_email", {"product_id": p.id}, f"low-stock-email:{p.id}:{today}")
+        for p in products
+    )
+
+
+@task("generate_thumbnails")
+def generate_thumbnails_task(label, name):
+    thumbnails.record_hash(label, name, thumbnails.generate_thumbnails(name))
+
+
+def queue_thumbnails(obj):
+    # called after a new image was saved; the old hash was cleared with it, so pages show the original until this runs
+    field_name, _ = thumbnails.IMAGE_FIELDS[obj._meta.label_lower]
+    image = getattr(obj, field_name)
+    if image:
+        label = obj._meta.label_lower
+        enqueue("generate_thumbnails", {"label": label, "name": image.name}, f"thumbnails:{label}:{image.name}")
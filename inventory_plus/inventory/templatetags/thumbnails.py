@@ -0,0 +1,11 @@
+from django import template
+
+from inventory.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(obj, size):
+    """{{ product|thumbnail:"grid" }} or {{ supplier|thumbnail:"detail" }}, see inventory.thumbnails.THUMBNAIL_SIZES."""
+    return thumbnail_url(obj, size)
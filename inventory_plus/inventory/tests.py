@@ -1,3 +1,591 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.db.models import F, Q
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from main.models import Sale
+from .importers import import_products_csv
+from .jobs import JOB_LEASE, MAX_ATTEMPTS, claim_jobs
+from .pagination import KeysetPaginator
+from .models import Category, Job, Product, ProductTombstone, StockLot, StockMovement, Supplier
+from .reports import stock_status_querysets
+from .retry import retry_on_lock
+from .search import search_products
+from .routers import STICKY_COOKIE, PrimaryReplicaRouter, StickyPrimaryMiddleware, read_only
+from .stock import InsufficientStock, adjust_stock, apply_stock_rows, remove_stock_many, set_low_stock_thresholds
+from .sync import SYNC_SETTLE, TOMBSTONE_RETENTION, InvalidCursor, changes_since
+from .summary import COUNTER_FIELDS, get_summary, rebuild_summary
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "query plans are checked with SQLite's EXPLAIN QUERY PLAN")
+class QueryPlanTests(TestCase):
+    """The hot report and alert queries must be answered through the indexes from migration 0011."""
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} not used by:\n{queryset.query}\n{plan}")
+
+    def test_stock_status_low_stock(self):
+        self.assertUsesIndex(stock_status_querysets()["low_stock"], "product_low_stock_idx")
+
+    def test_stock_status_expired(self):
+        self.assertUsesIndex(stock_status_querysets()["expired"], "stocklot_expiry_idx")
+
+    def test_stock_status_expiring_soon(self):
+        self.assertUsesIndex(stock_status_querysets(30)["expiring_soon"], "stocklot_expiry_idx")
+
+    def test_send_alerts_low_stock(self):
+        cutoff = timezone.now() - timedelta(hours=24)
+        products = Product.objects.filter(quantity__lte=F("low_stock_threshold")).filter(
+            Q(last_low_stock_notified__isnull=True) | Q(last_low_stock_notified__lt=cutoff)
+        ).order_by("quantity")
+        self.assertUsesIndex(products, "product_low_stock_idx")
+
+    def test_send_alerts_expiry(self):
+        lots = StockLot.objects.active().filter(
+            expiry_date__isnull=False, expiry_date__lte=timezone.localdate() + timedelta(days=30)
+        )
+        # the range is answered from the index without touching the lot rows
+        self.assertUsesIndex(lots.values("product_id", "quantity"), "COVERING INDEX stocklot_expiry_idx")
+
+    def test_fefo_lots(self):
+        lots = StockLot.objects.active().filter(product_id=1).order_by("expiry_date", "received_at")
+        self.assertUsesIndex(lots, "stocklot_fefo_idx")
+
+    def test_dashboard_top_products(self):
+        self.assertUsesIndex(Product.objects.order_by("-quantity", "-id")[:5], "product_quantity_idx")
+
+    def test_out_of_stock(self):
+        self.assertUsesIndex(Product.objects.filter(quantity=0), "product_quantity_idx")
+
+    def test_sales_by_product_and_date(self):
+        since = timezone.now() - timedelta(days=90)
+        self.assertUsesIndex(Sale.objects.filter(product_id=1, date__gte=since), "sale_product_date_idx")
+
+    def test_sales_by_date_range(self):
+        since = timezone.now() - timedelta(days=90)
+        self.assertUsesIndex(Sale.objects.filter(date__gte=since).order_by("date"), "sale_date_idx")
+
+
+class ViewQueryCountTests(TestCase):
+    """Product pages run a fixed number of queries however many products, categories and suppliers they show."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="x", is_staff=True, is_superuser=True)
+        cls.supplier = Supplier.objects.create(name="Acme", email="acme@example.com", phone="1")
+        cls.product = cls.create_products(3)[0]
+
+    @classmethod
+    def create_products(cls, count):
+        products = []
+        for i in range(count):
+            category = Category.objects.create(name=f"Category {Category.objects.count()}")
+            supplier = Supplier.objects.create(name=f"Supplier {i}", email="s@example.com", phone="1")
+            product = Product.objects.create(
+                name=f"Widget {category.id}", description="A widget", category=category, quantity=0,
+                low_stock_threshold=5, expiry_date=timezone.localdate() + timedelta(days=i - 1),
+            )
+            product.suppliers.set([cls.supplier, supplier])
+            products.append(product)
+        return products
+
+    def setUp(self):
+        cache.clear()
+
+    def assertViewQueries(self, num, url):
+        """Render url before and after adding more products; both renders must run exactly num queries."""
+        self.client.force_login(self.staff)
+        with self.assertNumQueries(num):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.create_products(3)
+        with self.assertNumQueries(num):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_all_products(self):
+        self.assertViewQueries(4, reverse("inventory:all_products_view"))
+
+    def test_product_detail(self):
+        self.assertViewQueries(4, reverse("inventory:product_detail_view", args=[self.product.id]))
+
+    def test_search(self):
+        self.assertViewQueries(5, reverse("inventory:search_products_view") + "?search=widget")
+
+    def test_supplier_detail(self):
+        self.assertViewQueries(4, reverse("inventory:supplier_detail_view", args=[self.supplier.id]))
+
+    def test_products_partial(self):
+        self.assertViewQueries(1, reverse("inventory:products_partial_view") + f"?supplier={self.supplier.id}")
+
+    def test_stock_status(self):
+        self.assertViewQueries(5, reverse("inventory:stock_status_view"))
+
+    def test_low_stock_report(self):
+        self.assertViewQueries(6, reverse("inventory:low_stock_report_view"))
+
+    def test_out_of_stock(self):
+        self.assertViewQueries(4, reverse("inventory:out_of_stock_view"))
+
+    def test_api_products(self):
+        self.assertViewQueries(6, reverse("inventory:api_resource_view", args=["products"]) + "?fields=name,suppliers")
+
+
+class ApiConditionalRequestTests(TestCase):
+    """API responses revalidate to a 304 until something they cover changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user("reader", password="x"))
+        self.products = [Product.objects.create(name=f"Widget {i}", description="") for i in range(2)]
+        self.url = reverse("inventory:api_resource_view", args=["products"]) + f"?ids={self.products[0].id}&fields=name"
+
+    def revalidate(self, etag):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_sparse_fields(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.json(), {"results": [{"id": self.products[0].id, "name": "Widget 0"}]})
+
+    def test_not_modified_until_changed(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.revalidate(etag), 304)
+        self.products[1].delete()
+        self.assertEqual(self.revalidate(etag), 304)
+        self.products[0].save()
+        self.assertEqual(self.revalidate(etag), 200)
+
+
+class KeysetPaginatorTests(TestCase):
+
+    def setUp(self):
+        self.categories = [Category.objects.create(name=name) for name in "cabed"]
+        self.paginator = KeysetPaginator(Category.objects.all(), 2, ordering=("name",))
+
+    def names(self, page):
+        return [category.name for category in page]
+
+    def tampered(self, value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+    def test_pages_both_ways(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual([self.names(page) for page in (first, second, third)], [["a", "b"], ["c", "d"], ["e"]])
+        self.assertIsNone(third.next_cursor)
+        self.assertEqual(self.names(self.paginator.get_page(third.previous_cursor)), ["c", "d"])
+
+    def test_bad_cursors_start_over(self):
+        id_paginator = KeysetPaginator(Product.objects.all(), 2)
+        for cursor in ["!!", self.tampered(["next", ["x"]]), self.tampered(["next", [{"a": 1}]]),
+                       self.tampered(["next", 5]), self.tampered(["sideways", [1]]), self.tampered({"a": 1})]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(id_paginator.decode_cursor(cursor), (None, None))
+                self.assertEqual(self.names(self.paginator.get_page(cursor)), ["a", "b"])
+        self.client.force_login(User.objects.create_user("clerk", password="x"))
+        response = self.client.get(reverse("inventory:all_products_view"), {"cursor": self.tampered(["next", ["x"]])})
+        self.assertEqual(response.status_code, 200)
+
+
+class AsyncStockStatusTests(TransactionTestCase):
+    """The async stock status renders the same page as the sync one (committed data: it reads on other connections)."""
+
+    def test_same_content(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user("staff", password="x", is_staff=True, is_superuser=True))
+        supplier = Supplier.objects.create(name="Acme", email="acme@example.com", phone="1")
+        for i in range(3):
+            product = Product.objects.create(
+                name=f"Widget {i}", description="A widget", category=Category.objects.create(name=f"Category {i}"),
+                quantity=i, expiry_date=timezone.localdate() + timedelta(days=i - 1),
+            )
+            product.suppliers.add(supplier)
+        expected = self.client.get(reverse("inventory:stock_status_view"))
+        response = self.client.get(reverse("inventory:stock_status_async_view"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "the FTS5 index only exists on SQLite")
+class SearchIndexTests(TestCase):
+    """The FTS5 index follows products, their category and their suppliers through the signals."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Dairy")
+        self.supplier = Supplier.objects.create(name="Acme", email="acme@example.com", phone="1")
+        self.product = Product.objects.create(name="Chocolate milk", description="Sweet", category=self.category)
+
+    def found(self, query):
+        return [product.name for product in search_products(query)[0:10]]
+
+    def test_product_changes(self):
+        self.assertEqual(self.found("choc mil"), ["Chocolate milk"])
+        self.product.name = "Cocoa"
+        self.product.save()
+        self.assertEqual(self.found("chocolate"), [])
+        self.assertEqual(self.found("cocoa"), ["Cocoa"])
+        self.product.delete()
+        self.assertEqual(self.found("cocoa"), [])
+
+    def test_category_changes(self):
+        self.category.name = "Drinks"
+        self.category.save()
+        self.assertEqual(self.found("drinks"), ["Chocolate milk"])
+        self.category.delete()
+        self.assertEqual(self.found("drinks"), [])
+
+    def test_supplier_changes(self):
+        self.product.suppliers.add(self.supplier)
+        self.assertEqual(self.found("acme"), ["Chocolate milk"])
+        self.supplier.name = "Globex"
+        self.supplier.save()
+        self.assertEqual(self.found("acme"), [])
+        self.assertEqual(self.found("globex"), ["Chocolate milk"])
+        self.supplier.product_set.clear()
+        self.assertEqual(self.found("globex"), [])
+        self.product.suppliers.add(self.supplier)
+        self.supplier.delete()
+        self.assertEqual(self.found("globex"), [])
+
+
+class StockSummaryTests(TestCase):
+    """The incrementally maintained dashboard counters match a recount after every kind of write."""
+
+    def assertInSync(self):
+        kept = get_summary()
+        kept = ({field: getattr(kept, field) for field in COUNTER_FIELDS}, kept.top_products)
+        recounted = rebuild_summary()
+        self.assertEqual(kept, ({field: getattr(recounted, field) for field in COUNTER_FIELDS}, recounted.top_products))
+
+    def test_counters_follow_every_write_path(self):
+        get_summary()
+        products = [
+            Product.objects.create(name=f"Widget {i}", description="", quantity=i * 3, low_stock_threshold=5)
+            for i in range(7)
+        ]
+        self.assertInSync()
+        products[0].quantity = 9
+        products[0].save()
+        self.assertInSync()
+        adjust_stock(products[6].id, -18)
+        self.assertInSync()
+        remove_stock_many({products[1].id: 3, products[2].id: 1})
+        self.assertInSync()
+        set_low_stock_thresholds({products[3].id: 20, products[4].id: 0})
+        self.assertInSync()
+        apply_stock_rows([{"product": products[5].id, "set_quantity": 1}, {"product": "Widget 0", "change_by": 50}])
+        self.assertInSync()
+        products[0].delete()
+        self.assertInSync()
+        import_products_csv(io.StringIO("name,quantity\nWidget 3,0\nGadget,100\n"))
+        self.assertInSync()
+        self.assertEqual(get_summary().total_products, 7)
+
+
+class DeltaSyncTests(TestCase):
+    """Rows are stamped on a test clock that moves a minute per pull, clear of the settle window."""
+
+    def setUp(self):
+        self.clock = timezone.now()
+        self.products = [Product.objects.create(name=f"Widget {i}", description="", quantity=i) for i in range(5)]
+        self.stamp(Product.objects.all())
+
+    def stamp(self, queryset):
+        field = "deleted_at" if queryset.model is ProductTombstone else "updated_at"
+        queryset.update(**{field: self.clock})
+
+    def pull(self, cursor=None, limit=2):
+        """Follow the feed until `more` is false, returns (product ids, deleted ids, cursor)."""
+        self.clock += timedelta(minutes=1)
+        products, deleted = [], []
+        while True:
+            page = changes_since(cursor, limit=limit, now=self.clock)
+            products += [row[0] for row in page["products"]]
+            deleted += page["deleted"]
+            cursor = page["cursor"]
+            if not page["more"]:
+                self.clock += timedelta(minutes=1)
+                return products, deleted, cursor
+
+    def test_full_download_then_deltas(self):
+        products, deleted, cursor = self.pull()
+        self.assertEqual(products, [p.id for p in self.products])
+        self.assertEqual(deleted, [])
+        self.assertEqual(self.pull(cursor)[:2], ([], []))
+
+        self.products[3].quantity = 30
+        self.products[3].save()
+        self.stamp(Product.objects.filter(pk=self.products[3].pk))
+        removed = self.products[1].id
+        self.products[1].delete()
+        self.stamp(ProductTombstone.objects.all())
+        products, deleted, cursor = self.pull(cursor)
+        self.assertEqual((products, deleted), ([self.products[3].id], [removed]))
+        self.assertEqual(self.pull(cursor)[:2], ([], []))
+
+    def test_settle_window(self):
+        # rows younger than SYNC_SETTLE are left for the next pull, an older transaction may still commit before them
+        page = changes_since(now=self.clock + SYNC_SETTLE / 2)
+        self.assertEqual(page["products"], [])
+        self.assertEqual(len(changes_since(page["cursor"], now=self.clock + SYNC_SETTLE)["products"]), 5)
+
+    def test_stale_cursor_needs_a_full_resync(self):
+        cursor = self.pull()[2]
+        page = changes_since(cursor, now=self.clock + TOMBSTONE_RETENTION)
+        self.assertTrue(page["full_resync"])
+        self.assertIsNone(page["cursor"])
+        self.assertFalse(changes_since(cursor, now=self.clock + TOMBSTONE_RETENTION / 2)["full_resync"])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            changes_since("not-a-cursor")
+        self.client.force_login(User.objects.create_user("device", password="x"))
+        response = self.client.get(reverse("inventory:sync_products_view") + "?cursor=abc")
+        self.assertEqual(response.status_code, 400)
+
+
+class StockServiceTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("clerk", password="x")
+        self.widget = Product.objects.create(name="Widget", description="", quantity=5)
+        self.gadget = Product.objects.create(name="Gadget", description="", quantity=2)
+
+    def quantities(self):
+        return list(Product.objects.order_by("id").values_list("quantity", flat=True))
+
+    def test_adjust_stock_writes_the_ledger(self):
+        movement = adjust_stock(self.widget.id, -3, user=self.user)
+        self.assertEqual((movement.change, movement.quantity_after, movement.user), (-3, 2, self.user))
+        self.assertEqual(self.quantities(), [2, 2])
+        self.assertEqual(sum(StockLot.objects.filter(product=self.widget).values_list("quantity", flat=True)), 2)
+
+    def test_adjust_stock_never_goes_negative(self):
+        with self.assertRaises(InsufficientStock):
+            adjust_stock(self.widget.id, -6)
+        with self.assertRaises(Product.DoesNotExist):
+            adjust_stock(0, 1)
+        self.assertEqual(self.quantities(), [5, 2])
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_remove_stock_many_is_all_or_nothing(self):
+        with self.assertRaises(InsufficientStock):
+            remove_stock_many({self.widget.id: 1, self.gadget.id: 3})
+        self.assertEqual(self.quantities(), [5, 2])
+        self.assertFalse(StockMovement.objects.exists())
+
+        remove_stock_many({self.widget.id: 1, self.gadget.id: 2})
+        self.assertEqual(self.quantities(), [4, 0])
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list("product_id", "change", "quantity_after")),
+            [(self.widget.id, -1, 4), (self.gadget.id, -2, 0)],
+        )
+
+    def test_update_stock_view_is_one_transaction(self):
+        self.client.force_login(self.user)
+        url = reverse("inventory:update_stock_view", args=[self.widget.id])
+        response = self.client.post(url, {"set_quantity": "10", "change_by": "-20", "low_stock_threshold": "1"})
+        self.assertEqual(
+            [str(m) for m in get_messages(response.wsgi_request)], ["Not enough stock to remove that many units"]
+        )
+        self.widget.refresh_from_db()
+        self.assertEqual((self.widget.quantity, self.widget.low_stock_threshold), (5, 5))
+        self.assertFalse(StockMovement.objects.exists())
+
+        response = self.client.post(url, {"set_quantity": "lots"})
+        self.assertIn("Stock not updated", str(list(get_messages(response.wsgi_request))[-1]))
+
+
+class BulkStockUpdateTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("clerk", password="x"))
+        self.product = Product.objects.create(name="Widget", description="", quantity=5)
+
+    def post(self, payload):
+        return self.client.post(reverse("inventory:bulk_stock_update_view"), payload, content_type="application/json")
+
+    def test_partial_failure(self):
+        response = self.post({"rows": [
+            {"product": self.product.id, "change_by": 3},
+            {"product": "Gadget", "set_quantity": 1},
+            {"product": "Widget", "change_by": -100},
+            {"product": self.product.id, "set_quantity": "many"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["updated"], body["failed"]), (1, 3))
+        self.assertEqual(
+            [(r["row"], r["status"], r.get("message")) for r in body["results"]],
+            [(1, "ok", None), (2, "error", "product not found"), (3, "error", "not enough stock"),
+             (4, "error", "invalid literal for int() with base 10: 'many'")],
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 8)
+        self.assertEqual(self.product.stock_movements.get().change, 3)
+
+    def test_invalid_payloads(self):
+        for payload in [{"rows": None}, {"rows": "abc"}, {"rows": [1]}, {"rows": {"product": 1}}, {}, [], "x"]:
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(payload).status_code, 400)
+        self.assertEqual(self.client.post(
+            reverse("inventory:bulk_stock_update_view"), "{", content_type="application/json"
+        ).status_code, 400)
+
+
+class ClaimJobsTests(TestCase):
+
+    def running_job(self, age, attempts=1):
+        job = Job.objects.create(task="noop", status=Job.RUNNING, attempts=attempts, locked_by="crashed")
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - age)
+        return job
+
+    def test_reclaims_abandoned_jobs(self):
+        abandoned = self.running_job(JOB_LEASE + timedelta(minutes=1))
+        self.running_job(JOB_LEASE - timedelta(minutes=1))
+        self.assertEqual([(job.pk, job.attempts) for job in claim_jobs()], [(abandoned.pk, 2)])
+
+    def test_abandoned_jobs_fail_after_max_attempts(self):
+        job = self.running_job(JOB_LEASE + timedelta(minutes=1), attempts=MAX_ATTEMPTS)
+        self.assertEqual(claim_jobs(), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+
+class ProductImporterTests(TestCase):
+
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name="Acme", email="acme@example.com", phone="1")
+        self.product = Product.objects.create(name="Widget", description="", quantity=5, low_stock_threshold=2)
+
+    def run_import(self, text):
+        return import_products_csv(io.StringIO(text))
+
+    def test_upsert(self):
+        report = self.run_import(
+            "name,description,quantity,price,category,suppliers\n"
+            "Widget,Updated,8,2.50,Tools,Acme\n"
+            "Gadget,New,3,1,Tools,\n"
+            ",No name,1,1,Tools,\n"
+        )
+        self.assertEqual((report.created, report.updated, report.failed), (1, 1, 1))
+        self.assertEqual(report.errors, [{"row": 4, "message": "missing name"}])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.description, self.product.quantity, self.product.category.name), ("Updated", 8, "Tools"))
+        self.assertEqual(list(self.product.suppliers.all()), [self.supplier])
+        self.assertEqual(Product.objects.get(name="Gadget").quantity, 3)
+        self.assertEqual(Category.objects.filter(name="Tools").count(), 1)
+
+    def test_ledger(self):
+        self.run_import("name,quantity\nWidget,8\nGadget,3\nEmpty,0\n")
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list("product__name", "change", "quantity_after", "reason")),
+            [("Gadget", 3, 3, StockMovement.IMPORT), ("Widget", 3, 8, StockMovement.IMPORT)],
+        )
+
+    def test_unknown_supplier_is_an_error(self):
+        report = self.run_import("name,quantity,suppliers\nGadget,1,Acme;Nobody\n")
+        self.assertEqual((report.created, report.failed), (0, 1))
+        self.assertIn("Nobody", report.errors[0]["message"])
+        self.assertFalse(Supplier.objects.filter(name="Nobody").exists())
+
+
+class LotExpiryTests(TestCase):
+    """An expiry date edited on the product moves its open lots, so later stock changes keep it."""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.product = Product.objects.create(name="Milk", description="", quantity=5, expiry_date=self.today)
+
+    def assertExpiry(self, expiry_date):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.expiry_date, expiry_date)
+        self.assertEqual(set(StockLot.objects.active().values_list("expiry_date", flat=True)), {expiry_date})
+
+    def test_form_edit(self):
+        self.product.expiry_date = (self.today + timedelta(days=7)).isoformat()
+        self.product.save()
+        adjust_stock(self.product.id, -1)
+        self.assertExpiry(self.today + timedelta(days=7))
+
+    def test_update_fields_edit(self):
+        self.product.expiry_date = self.today + timedelta(days=7)
+        self.product.save(update_fields=["expiry_date"])
+        adjust_stock(self.product.id, -1)
+        self.assertExpiry(self.today + timedelta(days=7))
+
+    def test_import(self):
+        later = self.today + timedelta(days=7)
+        import_products_csv(io.StringIO(f"name,quantity,expiry_date\nMilk,5,{later.isoformat()}\n"))
+        adjust_stock(self.product.id, -1)
+        self.assertExpiry(later)
+
+
+class RetryOnLockTests(SimpleTestCase):
+
+    def flaky(self, errors):
+        calls = []
+
+        @retry_on_lock(retries=2, delay=0)
+        def write():
+            calls.append(None)
+            if len(calls) <= len(errors):
+                raise errors[len(calls) - 1]
+            return len(calls)
+        return write
+
+    def test_retries_lock_errors(self):
+        self.assertEqual(self.flaky([OperationalError("database is locked")] * 2)(), 3)
+
+    def test_gives_up(self):
+        with self.assertRaisesMessage(OperationalError, "database is locked"):
+            self.flaky([OperationalError("database is locked")] * 3)()
+
+    def test_other_errors_are_not_retried(self):
+        with self.assertRaisesMessage(OperationalError, "no such table"):
+            self.flaky([OperationalError("no such table: x")])()
+
+    def test_not_retried_inside_a_transaction(self):
+        with mock.patch.object(connection, "in_atomic_block", True):
+            with self.assertRaises(OperationalError):
+                self.flaky([OperationalError("database is locked")])()
+
+
+@mock.patch("inventory.routers.replica_configured", return_value=True)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    def route(self, request):
+        @read_only
+        def view(request):
+            return {
+                model: (self.router.db_for_read(model), self.router.db_for_write(model))
+                for model in (Product, User)
+            }
+        return view(request)
+
+    def test_read_only_views_read_from_the_replica(self, configured):
+        routes = self.route(RequestFactory().get("/"))
+        self.assertEqual(routes[Product], ("replica", "default"))
+        # sessions and users stay on the primary
+        self.assertEqual(routes[User], (None, "default"))
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_sticky_after_write(self, configured):
+        response = StickyPrimaryMiddleware(lambda request: HttpResponse())(RequestFactory().post("/"))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        request = RequestFactory().get("/")
+        request.COOKIES[STICKY_COOKIE] = "1"
+        self.assertEqual(self.route(request)[Product], (None, "default"))
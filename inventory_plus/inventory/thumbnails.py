@@ -0,0 +1,82 @@
+import hashlib
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import caching
+
+# name: bounding box in pixels, twice the CSS size the templates show them at so they stay sharp on HiDPI screens
+THUMBNAIL_SIZES = {
+    "grid": (400, 400),
+    "detail": (1200, 1200),
+}
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_DIR = "thumbnails"
+
+# model label: (image field, hash field)
+IMAGE_FIELDS = {
+    "inventory.product": ("image", "image_hash"),
+    "inventory.supplier": ("logo", "logo_hash"),
+}
+
+
+def thumbnail_name(digest, size):
+    # content-hashed, so identical uploads share one set of files and a URL never changes meaning
+    return f"{THUMBNAIL_DIR}/{digest[:2]}/{digest}-{size}.webp"
+
+
+def thumbnail_url(obj, size):
+    """URL of `obj`'s image at one of THUMBNAIL_SIZES, or the original until its thumbnails exist."""
+    field_name, hash_name = IMAGE_FIELDS[obj._meta.label_lower]
+    digest = getattr(obj, hash_name)
+    if digest:
+        return default_storage.url(thumbnail_name(digest, size))
+    image = getattr(obj, field_name)
+    return image.url if image else ""
+
+
+def generate_thumbnails(name, storage=default_storage):
+    """
+    Render every THUMBNAIL_SIZES variant of the stored image `name` and return its content hash.
+    Variants already on disk are skipped, so re-running for the same content costs only the hashing.
+    """
+    with storage.open(name, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:32]
+
+    missing = {size: box for size, box in THUMBNAIL_SIZES.items() if not storage.exists(thumbnail_name(digest, size))}
+    if not missing:
+        return digest
+
+    with Image.open(BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "RGBA"):
+            source = source.convert("RGBA" if "transparency" in source.info or source.mode in ("LA", "P") else "RGB")
+        for size, box in missing.items():
+            image = source.copy()
+            image.thumbnail(box, Image.Resampling.LANCZOS)
+            out = BytesIO()
+            image.save(out, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, method=4)
+            storage.save(thumbnail_name(digest, size), ContentFile(out.getvalue()))
+    return digest
+
+
+def record_hash(label, name, digest):
+    """Point every row of model `label` whose image is the file `name` at its thumbnails."""
+    field_name, hash_name = IMAGE_FIELDS[label]
+    model = apps.get_model(label)
+    rows = model.objects.filter(**{field_name: name}).exclude(**{hash_name: digest})
+    ids = list(rows.values_list("id", flat=True))
+    if not ids:
+        return 0
+    # a queryset update: the image itself did not change, so search and stock summary are left alone
+    rows.update(**{hash_name: digest})
+    if label == "inventory.product":
+        caching.bump_products(ids)
+    else:
+        caching.bump("suppliers")
+    return len(ids)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = "inventory"
 
@@ -10,6 +10,8 @@ urlpatterns = [
     path('update/<int:product_id>/', views.update_product_view, name="update_product_view"),
     path('delete/<int:product_id>/', views.delete_product_view, name="delete_product_view"),
     path("search/", views.search_products_view, name="search_products_view"),
+    path('partial/', views.products_partial_view, name="products_partial_view"),
+    path('import/', views.import_products_view, name="import_products_view"),
 
     path('categories/', views.list_categories_view, name="list_categories_view"),
     path('categories/create/', views.create_category_view, name="create_category_view"),
@@ -24,11 +26,22 @@ urlpatterns = [
     path('supplier-reports/', views.supplier_report_view, name='supplier_reports'),
 
     path('stock/update/<int:product_id>/', views.update_stock_view, name="update_stock_view"),
+    path('stock/bulk-update/', views.bulk_stock_update_view, name="bulk_stock_update_view"),
+    path('stock/sync/', views.sync_products_view, name="sync_products_view"),
+    path('stock/stock-take/', views.stock_take_view, name="stock_take_view"),
     path('stock/status/', views.stock_status_view, name="stock_status_view"),
     path('low-stock/', views.low_stock_report_view, name="low_stock_report_view"),
     path('out-of-stock/', views.out_of_stock_view, name='out_of_stock_view'),
     path('supplier-reports/', views.supplier_report_view, name='supplier_reports'),
-    
 
+    path('async/stock/status/', views.stock_status_async_view, name="stock_status_async_view"),
 
+    path('purchase-orders/', views.purchase_orders_view, name="purchase_orders_view"),
+    path('purchase-orders/<int:order_id>/', views.purchase_order_detail_view, name="purchase_order_detail_view"),
+    path('purchase-orders/export/', views.export_purchase_orders_view, name="export_purchase_orders_view"),
+
+    path('api/<str:name>/', api.resource_list_view, name="api_resource_view"),
+
+    path('export/products/', views.export_products_view, name="export_products_view"),
+    path('export/stock-status/', views.export_stock_status_view, name="export_stock_status_view"),
 ]
@@ -1,6 +1,7 @@
 from django.core.mail import send_mail, EmailMessage
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.utils import timezone
 
 
 def notify_manager(subject, message):
@@ -13,7 +14,25 @@ def notify_manager(subject, message):
     )
 
 
+def send_low_stock_email(product):
+    subject = f"Low Stock Alert: {product.name}"
+    message = f"The stock for product '{product.name}' is low. Only {product.quantity} left in inventory."
+    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [settings.MANAGER_EMAIL])
+
+
 def send_stock_alert(product, alert_type):
+    # queued, the email itself is sent by deliver_stock_alert in a background job
+    from .jobs import enqueue
+
+    today = timezone.localdate().isoformat()
+    enqueue(
+        "send_stock_alert",
+        {"product_id": product.id, "alert_type": alert_type},
+        dedupe_key=f"stock-alert:{alert_type}:{product.id}:{today}",
+    )
+
+
+def deliver_stock_alert(product, alert_type):
     subject = f"Stock Alert: {product.name}"
     message = render_to_string('inventory/emails/stock_alert.html', {
         'product': product,
@@ -1,19 +1,41 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpRequest
+from django.urls import reverse
+from urllib.parse import urlencode
+from django.http import HttpRequest, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.http import require_POST
+from django.views.decorators.gzip import gzip_page
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.admin.views.decorators import staff_member_required
 from django.core.paginator import Paginator
-from django.utils import timezone
 from django.utils.safestring import mark_safe
-from django.core.mail import send_mail
-from django.conf import settings
+from asgiref.sync import sync_to_async
 from decimal import Decimal
-from datetime import timedelta
-from django.db.models import Count, Sum, F, Q
+from datetime import date
+from django.db.models import Count, Sum, F
+import csv
+import functools
+import io
 import json
-from .models import Product, Category, Supplier
+from .models import Product, Category, Supplier, PurchaseOrder
 from .forms import SupplierForm
+from .summary import get_summary
+from .pagination import KeysetPaginator
+from .search import search_products
+from .importers import import_products_csv
+from .tasks import queue_low_stock_emails, queue_thumbnails
+from .purchasing import (
+    PURCHASE_ORDER_HEADER, generate_purchase_orders, purchase_order_rows, purchase_orders_with_totals,
+)
+from .reports import stock_status_querysets
+from .exports import (
+    EXPORT_FORMATS, PRODUCT_HEADER, STOCK_STATUS_HEADER, product_rows, stock_status_rows, streaming_export_response,
+)
+from .stock import InsufficientStock, update_stock, apply_stock_rows
+from .sync import InvalidCursor, SYNC_PAGE_SIZE, changes_since
+from .concurrency import gather_queries
+from .routers import read_only
+from . import caching
 
 
 def is_admin(user):
@@ -40,6 +62,8 @@ def create_product_view(request: HttpRequest):
             )
             new_product.save()
             new_product.suppliers.set(request.POST.getlist("suppliers"))
+            if "image" in request.FILES:
+                queue_thumbnails(new_product)
             messages.success(request, "Product created successfully", "alert-success")
             return redirect("inventory:all_products_view")
         except Exception as e:
@@ -53,8 +77,15 @@ def create_product_view(request: HttpRequest):
 
 
 def product_detail_view(request: HttpRequest, product_id: int):
-    product = Product.objects.get(id=product_id)
-    return render(request, "inventory/product_detail.html", {"product": product})
+    version = caching.versions(caching.product_key(product_id), "categories", "suppliers")
+    product = caching.cached(
+        f"product_detail:{product_id}", version, lambda: Product.objects.for_detail().get(id=product_id)
+    )
+    return render(request, "inventory/product_detail.html", {
+        "product": product,
+        "cache_version": version,
+        "cache_timeout": caching.CACHE_TIMEOUT,
+    })
 
 
 @login_required
@@ -72,8 +103,11 @@ def update_product_view(request: HttpRequest, product_id: int):
         product.category = Category.objects.get(id=request.POST["category"])
         if "image" in request.FILES:
             product.image = request.FILES["image"]
+            product.image_hash = ""
         product.save()
         product.suppliers.set(request.POST.getlist("suppliers"))
+        if "image" in request.FILES:
+            queue_thumbnails(product)
         messages.success(request, "Product updated successfully", "alert-success")
         return redirect("inventory:product_detail_view", product_id=product.id)
 
@@ -101,27 +135,21 @@ def delete_product_view(request: HttpRequest, product_id: int):
 
 
 def all_products_view(request):
-    products_qs = Product.objects.all().order_by('-id')
+    products_qs = Product.objects.for_listing().order_by('-id')
+    summary = get_summary()
 
     total_products = low_stock_count = out_of_stock_count = available_count = 0
     if request.user.is_superuser:
-        total_products = products_qs.count()
-        low_stock_count = products_qs.filter(
-            quantity__lt=F('low_stock_threshold'),
-            quantity__gt=0
-        ).count()
-        out_of_stock_count = products_qs.filter(quantity=0).count()
-        available_count = products_qs.filter(
-            quantity__gte=F('low_stock_threshold')
-        ).count()
-
-    top_products = products_qs.order_by('-quantity')[:5]
-    pie_labels = [p.name for p in top_products]
-    pie_values = [p.quantity for p in top_products]
-
-    paginator = Paginator(products_qs, 6)
-    page_number = request.GET.get('page')
-    products_page = paginator.get_page(page_number)
+        total_products = summary.total_products
+        low_stock_count = summary.low_stock_count
+        out_of_stock_count = summary.out_of_stock_count
+        available_count = summary.available_count
+
+    pie_labels = [p["name"] for p in summary.top_products]
+    pie_values = [p["quantity"] for p in summary.top_products]
+
+    paginator = KeysetPaginator(products_qs, 6)
+    products_page = paginator.get_page(request.GET.get('cursor'))
 
     context = {
         'products': products_page,
@@ -135,25 +163,45 @@ def all_products_view(request):
     return render(request, 'inventory/all_products.html', context)
 
 
+@read_only
 def search_products_view(request: HttpRequest):
     query = request.GET.get("search", "")
     products = []
 
     if len(query) >= 3:
-        products = Product.objects.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(category__name__icontains=query) |
-            Q(suppliers__name__icontains=query)
-        ).distinct()
+        paginator = Paginator(search_products(query), 12)
+        products = paginator.get_page(request.GET.get("page"))
 
     return render(request, "inventory/search_products.html", {"products": products})
 
+@user_passes_test(is_admin)
+def import_products_view(request: HttpRequest):
+    report = None
+    if request.method == "POST" and "csv_file" in request.FILES:
+        csv_file = io.TextIOWrapper(request.FILES["csv_file"].file, encoding="utf-8-sig", newline="")
+        try:
+            report = import_products_csv(csv_file, user=request.user)
+            messages.success(request, "Products imported successfully", "alert-success")
+        except Exception as e:
+            print("Import error:", e)
+            messages.error(request, "Failed to import products", "alert-danger")
+
+    return render(request, "inventory/import_products.html", {"report": report})
+
 #-----CATAGORY-----
 
 def list_categories_view(request: HttpRequest):
-    categories = Category.objects.all()
-    return render(request, "inventory/categories_list.html", {"categories": categories})
+    cursor = request.GET.get("cursor")
+    version = caching.versions("categories")
+    categories = caching.cached(
+        f"categories:{cursor}", version,
+        lambda: KeysetPaginator(Category.objects.all(), 50, ordering=("name",)).get_page(cursor),
+    )
+    return render(request, "inventory/categories_list.html", {
+        "categories": categories,
+        "cache_version": version,
+        "cache_timeout": caching.CACHE_TIMEOUT,
+    })
 
 
 def create_category_view(request: HttpRequest):
@@ -211,8 +259,17 @@ def delete_category_view(request: HttpRequest, category_id: int):
 #-----SUPPLIERS-----
 
 def list_suppliers_view(request: HttpRequest):
-    suppliers = Supplier.objects.all()
-    return render(request, "inventory/suppliers_list.html", {"suppliers": suppliers})
+    cursor = request.GET.get("cursor")
+    version = caching.versions("suppliers")
+    suppliers = caching.cached(
+        f"suppliers:{cursor}", version,
+        lambda: KeysetPaginator(Supplier.objects.all(), 24, ordering=("name",)).get_page(cursor),
+    )
+    return render(request, "inventory/suppliers_list.html", {
+        "suppliers": suppliers,
+        "cache_version": version,
+        "cache_timeout": caching.CACHE_TIMEOUT,
+    })
 
 
 
@@ -224,7 +281,9 @@ def create_supplier_view(request: HttpRequest):
     if request.method == "POST":
         form = SupplierForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            supplier = form.save()
+            if "logo" in request.FILES:
+                queue_thumbnails(supplier)
             messages.success(request, "Supplier created successfully", "alert-success")
             return redirect("inventory:list_suppliers_view")
     else:
@@ -237,7 +296,11 @@ def update_supplier_view(request, supplier_id):
     if request.method == 'POST':
         form = SupplierForm(request.POST, request.FILES, instance=supplier)
         if form.is_valid():
+            if "logo" in request.FILES:
+                supplier.logo_hash = ""
             form.save()
+            if "logo" in request.FILES:
+                queue_thumbnails(supplier)
             return redirect("inventory:list_suppliers_view")
     else:
         form = SupplierForm(instance=supplier)
@@ -262,10 +325,37 @@ def delete_supplier_view(request: HttpRequest, supplier_id: int):
 
 def supplier_detail_view(request: HttpRequest, supplier_id: int):
     supplier = Supplier.objects.get(id=supplier_id)
-    products = Product.objects.filter(suppliers=supplier)
+    products = Product.objects.for_listing().filter(suppliers=supplier)
+    products_page = KeysetPaginator(products, 12).get_page(request.GET.get("cursor"))
     return render(request, "inventory/supplier_detail.html", {
         "supplier": supplier,
-        "products": products
+        "products": products_page,
+        "next_url": _partial_next_url(products_page, supplier=supplier.id),
+    })
+
+
+def _partial_next_url(page, **filters):
+    if not page.has_next():
+        return None
+    params = {**filters, "cursor": page.next_cursor}
+    return f"{reverse('inventory:products_partial_view')}?{urlencode(params)}"
+
+
+def products_partial_view(request: HttpRequest):
+    # next page of an infinite-scroll product list, rendered with products_list_partial.html
+    products = Product.objects.for_listing()
+    filters = {}
+    if request.GET.get("supplier"):
+        filters["supplier"] = int(request.GET["supplier"])
+        products = products.filter(suppliers=filters["supplier"])
+    if request.GET.get("category"):
+        filters["category"] = int(request.GET["category"])
+        products = products.filter(category=filters["category"])
+
+    products_page = KeysetPaginator(products, 12).get_page(request.GET.get("cursor"))
+    return render(request, "inventory/products_list_partial.html", {
+        "products": products_page,
+        "next_url": _partial_next_url(products_page, **filters),
     })
 
 #-----STOCK-----
@@ -277,72 +367,179 @@ def update_stock_view(request: HttpRequest, product_id: int):
         return redirect("accounts:sign_in")
 
     if request.method == "POST":
+        def optional(name, parse=int):
+            value = request.POST.get(name, "").strip()
+            return parse(value) if value else None
+
         try:
-            if request.POST.get("set_quantity", "").strip() != "":
-                product.quantity = int(request.POST["set_quantity"])
+            update_stock(
+                product.id,
+                set_quantity=optional("set_quantity"),
+                change_by=optional("change_by"),
+                low_stock_threshold=optional("low_stock_threshold", lambda value: max(0, int(value))),
+                expiry_date=optional("expiry_date", date.fromisoformat),
+                user=request.user,
+            )
+        except InsufficientStock:
+            messages.error(request, "Not enough stock to remove that many units", "alert-danger")
+        except ValueError as e:
+            messages.error(request, f"Stock not updated: {e}", "alert-danger")
 
-            if request.POST.get("change_by", "").strip() != "":
-                delta = int(request.POST["change_by"])
-                product.quantity = max(0, product.quantity + delta)
+        return redirect("inventory:product_detail_view", product_id=product.id)
 
-            low_stock_value = request.POST.get("low_stock_threshold")
-            if low_stock_value is not None and low_stock_value.strip() != "":
-                product.low_stock_threshold = max(0, int(low_stock_value))
+    return render(request, "inventory/update_stock.html", {"product": product})
 
-            product.save()
-        except Exception as e:
-            print("Stock update error:", e)
 
-        return redirect("inventory:product_detail_view", product_id=product.id)
+@login_required
+@require_POST
+def bulk_stock_update_view(request: HttpRequest):
+    try:
+        rows = json.loads(request.body)["rows"]
+    except (ValueError, KeyError, TypeError):
+        rows = None
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return JsonResponse({"error": "Expected a JSON body like {\"rows\": [{...}, ...]}"}, status=400)
 
-    return render(request, "inventory/update_stock.html", {"product": product})
+    results = apply_stock_rows(rows, user=request.user)
+    failed = sum(1 for r in results if r["status"] == "error")
+    return JsonResponse({"updated": len(results) - failed, "failed": failed, "results": results})
+
+
+@login_required
+@gzip_page
+def sync_products_view(request: HttpRequest):
+    try:
+        limit = int(request.GET.get("limit", SYNC_PAGE_SIZE))
+        changes = changes_since(request.GET.get("cursor") or None, limit=limit)
+    except (InvalidCursor, ValueError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    # products are column arrays (see "fields") without whitespace, gzip_page compresses when the device accepts it
+    return JsonResponse(changes, json_dumps_params={"separators": (",", ":")})
 
 
+@login_required
+def stock_take_view(request: HttpRequest):
+    context = {}
+    if request.method == "POST" and "csv_file" in request.FILES:
+        csv_file = io.TextIOWrapper(request.FILES["csv_file"].file, encoding="utf-8-sig", newline="")
+        results = apply_stock_rows(csv.DictReader(csv_file), user=request.user)
+        failed_rows = [r for r in results if r["status"] == "error"]
+        context = {
+            "processed": len(results),
+            "updated": len(results) - len(failed_rows),
+            "failed_rows": failed_rows,
+        }
+    return render(request, "inventory/stock_take.html", context)
+
+
+@read_only
 def stock_status_view(request: HttpRequest):
-    today = timezone.localdate()
     expiring_days = int(request.GET.get("expiring_days", 30))
+    buckets = stock_status_querysets(expiring_days)
+
+    return render(request, "inventory/stock_status.html", _stock_status_context(buckets, expiring_days))
+
 
-    low_stock_products = Product.objects.filter(quantity__lte=F('low_stock_threshold')).order_by("quantity")
-    expired_products = Product.objects.filter(expiry_date__isnull=False, expiry_date__lt=today).order_by("expiry_date")
-    expiring_soon_products = Product.objects.filter(
-        expiry_date__isnull=False,
-        expiry_date__gte=today,
-        expiry_date__lte=today + timedelta(days=expiring_days)
-    ).order_by("expiry_date")
-
-    return render(request, "inventory/stock_status.html", {
-        "low_stock_products": low_stock_products,
-        "expired_products": expired_products,
-        "expiring_soon_products": expiring_soon_products,
+def _stock_status_context(buckets, expiring_days):
+    return {
+        "low_stock_products": buckets["low_stock"],
+        "expired_products": buckets["expired"],
+        "expiring_soon_products": buckets["expiring_soon"],
         "expiring_days": expiring_days
-    })
+    }
 
 
 @staff_member_required
 def low_stock_report_view(request):
     low_stock_products = Product.objects.filter(quantity__lte=F('low_stock_threshold'))
-    for product in low_stock_products:
-        send_low_stock_email(product)
-    return render(request, "inventory/low_stock_report.html", {"products": low_stock_products})
+    queue_low_stock_emails(low_stock_products.only("id"))
+    return render(request, "inventory/low_stock_report.html", {
+        "products": low_stock_products.for_listing(suppliers=True),
+    })
 
 
 @staff_member_required
 def out_of_stock_view(request):
-    products = Product.objects.filter(quantity=0)
+    products = Product.objects.for_listing(suppliers=True).filter(quantity=0)
     return render(request, 'inventory/out_of_stock.html', {'products': products})
 
 
-def send_low_stock_email(product):
-    subject = f"Low Stock Alert: {product.name}"
-    message = f"The stock for product '{product.name}' is low. Only {product.quantity} left in inventory."
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [settings.MANAGER_EMAIL])
-
-
+@read_only
 def supplier_report_view(request):
-    suppliers = Supplier.objects.annotate(
+    # counts and totals move with every stock change, so this keys on the product list version too
+    version = caching.versions("suppliers", "products")
+    suppliers = caching.cached("supplier_report", version, lambda: list(Supplier.objects.annotate(
         product_count=Count('product', distinct=True),
         total_qty=Sum('product__quantity')
-    )
-    return render(request, "inventory/supplier_reports.html", {"suppliers": suppliers})
+    )))
+    return render(request, "inventory/supplier_reports.html", {
+        "suppliers": suppliers,
+        "cache_version": version,
+        "cache_timeout": caching.CACHE_TIMEOUT,
+    })
+
+
+
+#-----ASYNC DASHBOARDS-----
+# stock status for ASGI deployments: its three lists are queried side by side, see inventory.concurrency.
+# Only pages whose queries dominate gain from this; on the dashboard and the supplier report the thread
+# hops and extra connections cost more than the overlap saved (`manage.py benchmark --concurrency`), so
+# those stay sync only.
+
+@read_only
+async def stock_status_async_view(request):
+    expiring_days = int(request.GET.get("expiring_days", 30))
+    buckets = stock_status_querysets(expiring_days)
+    lists = await gather_queries(*(functools.partial(list, queryset) for queryset in buckets.values()))
+    context = _stock_status_context(dict(zip(buckets, lists)), expiring_days)
+    return await sync_to_async(render)(request, "inventory/stock_status.html", context)
 
 
+#-----PURCHASE ORDERS-----
+
+@staff_member_required
+def purchase_orders_view(request: HttpRequest):
+    if request.method == "POST":
+        orders, unassigned = generate_purchase_orders()
+        messages.success(request, f"Generated {len(orders)} draft purchase orders", "alert-success")
+        if unassigned:
+            messages.warning(request, f"{len(unassigned)} low-stock products have no supplier", "alert-warning")
+        return redirect("inventory:purchase_orders_view")
+
+    return render(request, "inventory/purchase_orders.html", {"orders": purchase_orders_with_totals()})
+
+
+@staff_member_required
+def purchase_order_detail_view(request: HttpRequest, order_id: int):
+    order = get_object_or_404(PurchaseOrder.objects.select_related("supplier"), id=order_id)
+    lines = order.lines.select_related("product").order_by("product__name")
+    return render(request, "inventory/purchase_order_detail.html", {"order": order, "lines": lines})
+
+
+@staff_member_required
+@read_only
+def export_purchase_orders_view(request: HttpRequest):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format")
+    return streaming_export_response(PURCHASE_ORDER_HEADER, purchase_order_rows(), fmt, "purchase_orders")
+
+#-----EXPORTS-----
+
+@staff_member_required
+@read_only
+def export_products_view(request: HttpRequest):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format")
+    return streaming_export_response(PRODUCT_HEADER, product_rows(), fmt, "products")
+
+
+@staff_member_required
+@read_only
+def export_stock_status_view(request: HttpRequest):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format")
+    expiring_days = int(request.GET.get("expiring_days", 30))
+    return streaming_export_response(STOCK_STATUS_HEADER, stock_status_rows(expiring_days), fmt, "stock_status")
@@ -0,0 +1,80 @@
+"""
+DATABASES['default'] from the environment, imported by settings.py.
+
+DB_ENGINE=sqlite (default) keeps the single-file database, tuned for several worker processes:
+WAL lets readers run alongside the one writer, writers queue on the busy timeout instead of
+failing at once, and transactions take the write lock up front (BEGIN IMMEDIATE) so a reader
+never has to upgrade mid-transaction, which SQLite answers with "database is locked" right away.
+
+DB_ENGINE=postgresql switches to PostgreSQL with the DB_NAME/DB_USER/DB_PASSWORD/DB_HOST/DB_PORT
+variables; the application code is the same for both.
+
+A read replica is added as the "replica" alias when DB_REPLICA_NAME (SQLite: a second file kept
+up to date by `manage.py sync_replica`) or DB_REPLICA_HOST (PostgreSQL) is set, see inventory/routers.py.
+"""
+import copy
+
+ENGINES = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+}
+
+SQLITE_PRAGMAS = {
+    # stored in the file: the first connection (any manage.py command) converts it, and it keeps
+    # -wal/-shm files beside it from then on, which is why db.sqlite3 is git-ignored
+    "journal_mode": "WAL",
+    # in WAL mode NORMAL only fsyncs at checkpoints: a power cut may lose the last commits, never corrupt the file
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+}
+
+
+def sqlite_init_command(mmap_size):
+    pragmas = {**SQLITE_PRAGMAS, "mmap_size": mmap_size}
+    return ";".join(f"PRAGMA {name}={value}" for name, value in pragmas.items())
+
+
+def database_settings(config, base_dir):
+    """`config` is decouple's config(), so values come from the environment or a .env file."""
+    engine = config("DB_ENGINE", default="sqlite")
+    if engine not in ENGINES:
+        raise ValueError(f"DB_ENGINE must be one of {', '.join(ENGINES)}, not {engine!r}")
+
+    database = {
+        "ENGINE": ENGINES[engine],
+        # persistent connections: each worker reuses its connection for this many seconds (0 closes it after every request)
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+        "CONN_HEALTH_CHECKS": True,
+    }
+    if engine == "sqlite":
+        database["NAME"] = config("DB_NAME", default=str(base_dir / "db.sqlite3"))
+        database["OPTIONS"] = {
+            # seconds a writer waits for the lock before "database is locked" (sqlite's busy_timeout)
+            "timeout": config("DB_BUSY_TIMEOUT", default=20, cast=int),
+            "transaction_mode": "IMMEDIATE",
+            "init_command": sqlite_init_command(config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int)),
+        }
+    else:
+        database.update({
+            "NAME": config("DB_NAME", default="inventory_plus"),
+            "USER": config("DB_USER", default=""),
+            "PASSWORD": config("DB_PASSWORD", default=""),
+            "HOST": config("DB_HOST", default=""),
+            "PORT": config("DB_PORT", default=""),
+        })
+    return database
+
+
+def replica_settings(config, primary):
+    """The "replica" alias: the primary's settings pointed at the replica, or None when there is none."""
+    sqlite = primary["ENGINE"] == ENGINES["sqlite"]
+    location = config("DB_REPLICA_NAME" if sqlite else "DB_REPLICA_HOST", default="")
+    if not location:
+        return None
+    replica = copy.deepcopy(primary)
+    replica["NAME" if sqlite else "HOST"] = location
+    if not sqlite:
+        replica["PORT"] = config("DB_REPLICA_PORT", default=primary["PORT"])
+    # tests run against one database, the replica alias reads from it too
+    replica["TEST"] = {"MIRROR": "default"}
+    return replica
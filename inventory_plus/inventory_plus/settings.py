@@ -14,6 +14,8 @@ from pathlib import Path
 from decouple import config
 import os
 
+from .database import database_settings, replica_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -54,6 +56,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.profiling.ProfilingMiddleware',
+    'inventory.routers.StickyPrimaryMiddleware',
 ]
 
 ROOT_URLCONF = 'inventory_plus.urls'
@@ -80,13 +84,48 @@ WSGI_APPLICATION = 'inventory_plus.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# SQLite (WAL, busy timeout, persistent connections) or PostgreSQL, picked by DB_ENGINE, see inventory_plus/database.py
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(config, BASE_DIR),
+}
+if replica := replica_settings(config, DATABASES['default']):
+    DATABASES['replica'] = replica
+
+# views decorated with inventory.routers.read_only read from the replica when there is one, see inventory/routers.py
+DATABASE_ROUTERS = ['inventory.routers.PrimaryReplicaRouter']
+# seconds the replica may trail the primary: clients stay on the primary this long after a write
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=10, cast=int)
+
+# write paths decorated with inventory.retry.retry_on_lock retry lock errors this many times, backing off exponentially
+DB_LOCK_RETRIES = config('DB_LOCK_RETRIES', default=5, cast=int)
+
+
+# Cache
+# the local-memory cache is per process: with several worker processes use CACHE_BACKEND=file (shared
+# directory) or db (run `manage.py createcachetable` first) so version bumps from signals reach every worker
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-plus',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'inventory_cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
+CACHES = {'default': CACHE_BACKENDS[config('CACHE_BACKEND', default='locmem')]}
+
+# rendered fragments and cached querysets are keyed on version stamps (inventory/caching.py), the timeout only bounds memory
+INVENTORY_CACHE_TIMEOUT = config('INVENTORY_CACHE_TIMEOUT', default=600, cast=int)
 
 
 # Password validation
@@ -148,3 +187,15 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 
 LOGIN_URL = '/accounts/signin/'
+
+# "database": jobs wait for `manage.py run_jobs`, "thread": run in-process right after commit (development)
+INVENTORY_JOBS_MODE = config('INVENTORY_JOBS_MODE', default='database')
+
+# deleted product ids kept for /stock/sync/; devices that last synced before that do a full download
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=90, cast=int)
+
+# per-view timings and query counts, see main/profiling.py; summaries at /main/profiling/ and `manage.py profiling_report`
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_BUFFER_SIZE = config('PROFILING_BUFFER_SIZE', default=500, cast=int)
+PROFILING_DUMP_INTERVAL = config('PROFILING_DUMP_INTERVAL', default=60, cast=int)
+PROFILING_DUMP_PATH = config('PROFILING_DUMP_PATH', default=str(BASE_DIR / 'profiling.json'))
@@ -0,0 +1,208 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from inventory.models import Product
+from inventory.retry import retry_on_lock
+from .models import Sale, SalesDailyRollup, SalesRollupRebuild
+
+
+REBUILD_CHUNK_DAYS = 30
+# sales stamped this long before a rebuild started may still be committing, their days are recounted at the end
+REBUILD_SETTLE = timedelta(minutes=5)
+REVENUE = ExpressionWrapper(F("price_at_sale") * F("quantity"), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _sale_key(sale):
+    return timezone.localdate(sale.date), sale.product_id
+
+
+def _apply(totals, sign):
+    """
+    Add (sign=1) or remove (sign=-1) {(day, product_id): [units, revenue, count]} from the rollup table:
+    one INSERT for missing rows, then one UPDATE with a CASE per column.
+    """
+    if not totals:
+        return
+    if sign > 0:
+        categories = dict(
+            Product.objects.filter(pk__in={product_id for _, product_id in totals}).values_list("id", "category_id")
+        )
+        SalesDailyRollup.objects.bulk_create(
+            [
+                SalesDailyRollup(day=day, product_id=product_id, category_id=categories.get(product_id))
+                for day, product_id in totals
+            ],
+            ignore_conflicts=True,
+        )
+
+    def delta(index, output_field):
+        return Case(
+            *[
+                When(day=day, product_id=product_id, then=Value(sign * values[index]))
+                for (day, product_id), values in totals.items()
+            ],
+            output_field=output_field,
+        )
+
+    matches = Q()
+    for day, product_id in totals:
+        matches |= Q(day=day, product_id=product_id)
+    SalesDailyRollup.objects.filter(matches).update(
+        units=F("units") + delta(0, IntegerField()),
+        revenue=F("revenue") + delta(1, DecimalField(max_digits=14, decimal_places=2)),
+        sales_count=F("sales_count") + delta(2, IntegerField()),
+    )
+
+
+def _totals(sales):
+    totals = defaultdict(lambda: [0, Decimal("0"), 0])
+    for sale in sales:
+        row = totals[_sale_key(sale)]
+        row[0] += sale.quantity
+        row[1] += Decimal(sale.price_at_sale) * sale.quantity
+        row[2] += 1
+    return totals
+
+
+def record_sales(sales):
+    _apply(_totals(sales), 1)
+
+
+def remove_sales(sales):
+    _apply(_totals(sales), -1)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _rebuild_window(start, stop=None):
+    # a range on the raw column is answered from sale_date_idx, a filter on TruncDate scans every sale
+    sales = Sale.objects.filter(date__gte=_day_start(start))
+    if stop is not None:
+        sales = sales.filter(date__lt=_day_start(stop))
+    return (
+        sales.annotate(day=TruncDate("date"))
+        .values("day", "product_id", "product__category_id")
+        .annotate(units=Sum("quantity"), revenue=Sum(REVENUE), sales_count=Count("id"))
+    )
+
+
+@retry_on_lock
+def _stage_window(rows):
+    with transaction.atomic():
+        SalesRollupRebuild.objects.bulk_create(
+            [
+                SalesRollupRebuild(
+                    day=row["day"], product_id=row["product_id"], units=row["units"],
+                    revenue=row["revenue"], sales_count=row["sales_count"],
+                )
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+
+
+@retry_on_lock
+def _swap_in(fresh_from):
+    """Replace the rollups with the staged rows plus the days from `fresh_from` on, counted right now."""
+    rollups, staged, products = (
+        SalesDailyRollup._meta.db_table, SalesRollupRebuild._meta.db_table, Product._meta.db_table
+    )
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # SQLite's IMMEDIATE transactions already hold the write lock, PostgreSQL needs it spelt out
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {rollups} IN EXCLUSIVE MODE")
+        SalesDailyRollup.objects.all().delete()
+        with connection.cursor() as cursor:
+            # joined to the products: ones deleted since their window was staged are dropped, categories are current
+            cursor.execute(
+                f"INSERT INTO {rollups} (day, product_id, category_id, units, revenue, sales_count) "
+                f"SELECT s.day, s.product_id, p.category_id, s.units, s.revenue, s.sales_count "
+                f"FROM {staged} s JOIN {products} p ON p.id = s.product_id WHERE s.day < %s",
+                [fresh_from],
+            )
+            staged_rows = cursor.rowcount
+        fresh = [
+            SalesDailyRollup(
+                day=row["day"], product_id=row["product_id"], category_id=row["product__category_id"],
+                units=row["units"], revenue=row["revenue"], sales_count=row["sales_count"],
+            )
+            for row in _rebuild_window(fresh_from)
+        ]
+        SalesDailyRollup.objects.bulk_create(fresh, batch_size=1000)
+    return staged_rows + len(fresh)
+
+
+def rebuild_rollups(chunk_days=REBUILD_CHUNK_DAYS, progress=None):
+    """
+    Recompute the rollup table from Sale, one window of `chunk_days` at a time.
+    Every (day, product) falls into exactly one window, so each window is a single bulk insert.
+
+    Windows go into the SalesRollupRebuild staging table, each in its own short transaction, while
+    reports keep reading the old rollups and record_sale keeps updating them. The days from
+    REBUILD_SETTLE before the start on, which sales may still be landing in, are counted again in
+    the final transaction that swaps the staged rows in.
+    """
+    fresh_from = timezone.localdate(timezone.now() - REBUILD_SETTLE)
+    SalesRollupRebuild.objects.all().delete()
+
+    first = Sale.objects.order_by("date").values_list("date", flat=True).first()
+    start = timezone.localdate(first) if first is not None else fresh_from
+    while start < fresh_from:
+        stop = min(start + timedelta(days=chunk_days), fresh_from)
+        rows = list(_rebuild_window(start, stop))
+        _stage_window(rows)
+        if progress:
+            progress(start, stop, len(rows))
+        start = stop
+
+    created = _swap_in(fresh_from)
+    SalesRollupRebuild.objects.all().delete()
+    return created
+
+
+# ---- reports, all answered from the rollup table ----
+
+def _window(start, end):
+    return SalesDailyRollup.objects.filter(day__gte=start, day__lte=end)
+
+
+def sales_totals(start, end):
+    totals = _window(start, end).aggregate(units=Sum("units"), revenue=Sum("revenue"), sales_count=Sum("sales_count"))
+    return {
+        "units": totals["units"] or 0,
+        "revenue": totals["revenue"] or Decimal("0"),
+        "sales_count": totals["sales_count"] or 0,
+    }
+
+
+def revenue_by_day(start, end):
+    return list(
+        _window(start, end).values("day")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("day")
+    )
+
+
+def top_products(start, end, limit=10, by="revenue"):
+    return list(
+        _window(start, end).values("product_id", "product__name")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"))
+        .order_by(f"-{by}", "product_id")[:limit]
+    )
+
+
+def sales_by_category(start, end):
+    return list(
+        _window(start, end).values("category_id", "category__name")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("-revenue")
+    )
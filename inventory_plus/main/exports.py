@@ -0,0 +1,14 @@
+from inventory.exports import EXPORT_CHUNK_SIZE
+
+from .models import Sale
+
+
+SALE_HEADER = ["id", "date", "product_id", "product", "quantity", "price_at_sale", "total_price", "user"]
+
+
+def sale_rows():
+    sales = Sale.objects.order_by("id").values_list(
+        "id", "date", "product_id", "product__name", "quantity", "price_at_sale", "user__username"
+    )
+    for sale_id, date, product_id, product, quantity, price, username in sales.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [sale_id, date, product_id, product, quantity, price, price * quantity, username or ""]
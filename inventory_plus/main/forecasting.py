@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from inventory.models import Product
+from inventory.stock import set_low_stock_thresholds
+from .models import SalesDailyRollup
+
+
+DEFAULT_HISTORY_DAYS = 90
+DEFAULT_WINDOW = 28
+DEFAULT_ALPHA = 0.3
+DEFAULT_LEAD_TIME = 7
+DEFAULT_REVIEW_DAYS = 14
+DEFAULT_SERVICE_Z = 1.65  # ~95% cycle service level
+
+
+class DemandForecast:
+    """
+    Demand statistics for the whole catalog, one array element per product.
+
+    Sales come from the daily rollup table in a single query. Every statistic below is a per-product
+    sum over those rows accumulated with np.bincount (days without a row count as zero), so memory
+    follows the catalog size and the number of rollup rows, not products x days.
+    """
+
+    def __init__(self, history_days=DEFAULT_HISTORY_DAYS, window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA,
+                 lead_time=DEFAULT_LEAD_TIME, review_days=DEFAULT_REVIEW_DAYS, service_z=DEFAULT_SERVICE_Z,
+                 end=None):
+        self.history_days = history_days
+        self.window = min(window, history_days)
+        self.alpha = alpha
+        self.lead_time = lead_time
+        self.review_days = review_days
+        self.service_z = service_z
+        self.end = end or timezone.localdate()
+        self.start = self.end - timedelta(days=history_days - 1)
+
+        self._load()
+        self._compute()
+
+    def _load(self):
+        catalog = list(Product.objects.order_by("id").values_list("id", "name", "quantity", "low_stock_threshold"))
+        self.product_ids = np.array([row[0] for row in catalog], dtype=np.int64)
+        self.names = [row[1] for row in catalog]
+        self.quantity = np.array([row[2] for row in catalog], dtype=np.float64)
+        self.current_threshold = np.array([row[3] for row in catalog], dtype=np.int64)
+
+        # one entry per rollup row: the product's position in the catalog, the day's offset from start, units
+        self.positions = np.zeros(0, dtype=np.int64)
+        self.day_offsets = np.zeros(0, dtype=np.int64)
+        self.units = np.zeros(0, dtype=np.float64)
+        history = SalesDailyRollup.objects.filter(day__gte=self.start, day__lte=self.end).values_list(
+            "product_id", "day", "units"
+        )
+        rows = list(history)
+        if not rows or not len(catalog):
+            return
+        product_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        day_offsets = np.array([(r[1] - self.start).days for r in rows], dtype=np.int64)
+        units = np.array([r[2] for r in rows], dtype=np.float64)
+
+        positions = np.searchsorted(self.product_ids, product_ids)
+        known = (positions < len(self.product_ids)) & (self.product_ids[np.minimum(positions, len(self.product_ids) - 1)] == product_ids)
+        self.positions, self.day_offsets, self.units = positions[known], day_offsets[known], units[known]
+
+    def _per_product(self, weights):
+        """Sum of `weights` (one per rollup row) for every product in the catalog."""
+        return np.bincount(self.positions, weights=weights, minlength=len(self.product_ids))
+
+    def _compute(self):
+        no_history = np.zeros(len(self.product_ids))
+        recent = self.day_offsets >= self.history_days - self.window
+        self.moving_average = self._per_product(self.units * recent) / self.window if self.window else no_history
+
+        # exponential smoothing in closed form: newest day weighs alpha, each older day (1 - alpha) times less
+        ages = np.arange(self.history_days)[::-1]
+        weights = self.alpha * (1 - self.alpha) ** ages
+        self.smoothed = (
+            self._per_product(self.units * weights[self.day_offsets]) / weights.sum() if self.history_days else no_history
+        )
+
+        # the higher of the two, so both a steady trend and a recent spike raise the reorder point
+        self.daily_rate = np.maximum(self.moving_average, self.smoothed)
+        if self.history_days:
+            # std over every day of the history, days without a rollup row being zeros: E[x^2] - E[x]^2
+            mean = self._per_product(self.units) / self.history_days
+            mean_square = self._per_product(self.units ** 2) / self.history_days
+            self.std = np.sqrt(np.maximum(mean_square - mean ** 2, 0))
+        else:
+            self.std = no_history
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.days_of_cover = np.where(self.daily_rate > 0, self.quantity / self.daily_rate, np.inf)
+
+        safety_stock = self.service_z * self.std * np.sqrt(self.lead_time)
+        self.reorder_point = np.ceil(self.daily_rate * self.lead_time + safety_stock).astype(np.int64)
+        target = self.reorder_point + self.daily_rate * self.review_days
+        self.order_quantity = np.maximum(np.ceil(target - self.quantity), 0).astype(np.int64)
+
+    def rows(self, order_by_cover=True, limit=None):
+        order = np.argsort(self.days_of_cover, kind="stable") if order_by_cover else np.arange(len(self.product_ids))
+        if limit is not None:
+            order = order[:limit]
+        for i in order:
+            cover = self.days_of_cover[i]
+            yield {
+                "product_id": int(self.product_ids[i]),
+                "name": self.names[i],
+                "quantity": int(self.quantity[i]),
+                "moving_average": round(float(self.moving_average[i]), 2),
+                "smoothed": round(float(self.smoothed[i]), 2),
+                "days_of_cover": None if np.isinf(cover) else round(float(cover), 1),
+                "current_threshold": int(self.current_threshold[i]),
+                "reorder_point": int(self.reorder_point[i]),
+                "order_quantity": int(self.order_quantity[i]),
+            }
+
+    def apply_thresholds(self):
+        """
+        Write the reorder points back as low_stock_threshold, only for products where it changed.
+        Products without sales in the history window keep their threshold: no demand is no evidence.
+        """
+        changed = (self.reorder_point != self.current_threshold) & (self.daily_rate > 0)
+        thresholds = dict(zip(self.product_ids[changed].tolist(), self.reorder_point[changed].tolist()))
+        set_low_stock_thresholds(thresholds)
+        return len(thresholds)
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from main.forecasting import (
+    DEFAULT_ALPHA, DEFAULT_HISTORY_DAYS, DEFAULT_LEAD_TIME, DEFAULT_REVIEW_DAYS, DEFAULT_SERVICE_Z, DEFAULT_WINDOW,
+    DemandForecast,
+)
+
+
+class Command(BaseCommand):
+    help = "Forecast demand from sales history and suggest reorder points and quantities for every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--history-days", type=int, default=DEFAULT_HISTORY_DAYS, help=f"Days of sales history to load (default: {DEFAULT_HISTORY_DAYS}).")
+        parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help=f"Moving-average window in days (default: {DEFAULT_WINDOW}).")
+        parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help=f"Exponential smoothing factor (default: {DEFAULT_ALPHA}).")
+        parser.add_argument("--lead-time", type=int, default=DEFAULT_LEAD_TIME, help=f"Supplier lead time in days (default: {DEFAULT_LEAD_TIME}).")
+        parser.add_argument("--review-days", type=int, default=DEFAULT_REVIEW_DAYS, help=f"Days between orders (default: {DEFAULT_REVIEW_DAYS}).")
+        parser.add_argument("--service-z", type=float, default=DEFAULT_SERVICE_Z, help=f"Safety stock z-score (default: {DEFAULT_SERVICE_Z}).")
+        parser.add_argument("--limit", type=int, default=50, help="Products to print, lowest days of cover first (default: 50).")
+        parser.add_argument("--json", action="store_true", help="Print the suggestions as JSON.")
+        parser.add_argument("--apply", action="store_true", help="Write the reorder points back as low_stock_threshold.")
+
+    def handle(self, *args, **options):
+        forecast = DemandForecast(
+            history_days=options["history_days"],
+            window=options["window"],
+            alpha=options["alpha"],
+            lead_time=options["lead_time"],
+            review_days=options["review_days"],
+            service_z=options["service_z"],
+        )
+        rows = list(forecast.rows(limit=options["limit"]))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+        else:
+            for row in rows:
+                cover = "-" if row["days_of_cover"] is None else row["days_of_cover"]
+                self.stdout.write(
+                    f"{row['name']}: qty {row['quantity']}, {row['smoothed']}/day, cover {cover} days, "
+                    f"reorder at {row['reorder_point']}, order {row['order_quantity']}"
+                )
+
+        if options["apply"]:
+            updated = forecast.apply_thresholds()
+            self.stdout.write(self.style.SUCCESS(f"Updated low stock threshold for {updated} products."))
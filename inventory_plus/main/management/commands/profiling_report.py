@@ -0,0 +1,42 @@
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.profiling import read_dump
+
+
+class Command(BaseCommand):
+    help = "Print the per-view profiling summary the server last wrote to PROFILING_DUMP_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="Dump file to read (default: PROFILING_DUMP_PATH).")
+        parser.add_argument("--json", action="store_true", help="Print the raw JSON summary.")
+        parser.add_argument("--duplicates", action="store_true", help="Also list the repeated queries per view.")
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.PROFILING_DUMP_PATH
+        try:
+            dump = read_dump(path)
+        except FileNotFoundError:
+            raise CommandError(f"No profiling dump at {path}; is PROFILING_ENABLED set on the server?")
+
+        if options["json"]:
+            self.stdout.write(json.dumps(dump, indent=2))
+            return
+
+        generated = datetime.fromtimestamp(dump["generated_at"]).isoformat(timespec="seconds")
+        self.stdout.write(f"pid {dump['pid']}, written {generated}")
+        self.stdout.write(
+            f"{'view':<45} {'reqs':>6} {'wall p50':>9} {'wall p95':>9} {'wall p99':>9} "
+            f"{'db p95':>8} {'queries':>8} {'tmpl p95':>9}"
+        )
+        for row in dump["views"]:
+            self.stdout.write(
+                f"{row['view']:<45} {row['requests']:>6} {row['wall_ms_p50']:>9} {row['wall_ms_p95']:>9} "
+                f"{row['wall_ms_p99']:>9} {row['db_ms_p95']:>8} {row['queries_p50']:>8} {row['template_ms_p95']:>9}"
+            )
+            if options["duplicates"]:
+                for dup in row["duplicates"]:
+                    self.stdout.write(f"    {dup['count']:>5}x {dup['sql'][:160]}")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from main.analytics import REBUILD_CHUNK_DAYS, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollup table from the Sale history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=REBUILD_CHUNK_DAYS,
+            help=f"Days of sales aggregated per query (default: {REBUILD_CHUNK_DAYS}).",
+        )
+
+    def handle(self, *args, **options):
+        def progress(start, stop, rows):
+            self.stdout.write(f"{start} .. {stop}: {rows} rollup rows")
+
+        created = rebuild_rollups(chunk_days=options["chunk_days"], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Sales rollups rebuilt: {created} rows."))
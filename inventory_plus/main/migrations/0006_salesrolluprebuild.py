@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_salesdailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollupRebuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('product_id', models.IntegerField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from inventory.models import Product
+from inventory.models import Product, Category
 
 class Sale(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -8,10 +8,47 @@ class Sale(models.Model):
     price_at_sale = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     date = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="purchases", null=True, blank=True)
-   
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "date"], name="sale_product_date_idx"),
+            models.Index(fields=["date"], name="sale_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.quantity} on {self.date.strftime('%Y-%m-%d')}"
 
     @property
     def total_price(self):
         return self.price_at_sale * self.quantity
+
+
+class SalesDailyRollup(models.Model):
+    # one row per product per day, maintained by main.analytics as sales are recorded
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sales_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product"], name="sales_rollup_day_product_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["product", "day"], name="sales_rollup_product_day_idx"),
+            models.Index(fields=["category", "day"], name="sales_rollup_category_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.units} units"
+
+
+class SalesRollupRebuild(models.Model):
+    # staging rows of main.analytics.rebuild_rollups, copied into SalesDailyRollup once complete
+    day = models.DateField()
+    product_id = models.IntegerField()
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sales_count = models.PositiveIntegerField(default=0)
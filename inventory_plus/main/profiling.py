@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+PERCENTILES = (50, 95, 99)
+METRICS = ("wall_ms", "db_ms", "queries", "template_ms")
+TOP_DUPLICATES = 5
+# duplicated statements remembered per view; SQL with inlined literals or IN lists of varying length
+# makes a new fingerprint per request, so the rarest are dropped whenever twice this many pile up
+DUPLICATES_KEPT = 50
+
+_current = ContextVar("profiling_request", default=None)
+
+
+class RequestProfile:
+    __slots__ = ("db_time", "queries", "fingerprints", "template_time", "template_depth")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.fingerprints = Counter()
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: the SQL still has its placeholders, so it doubles as the fingerprint
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[sql] += 1
+
+
+def _profiled_render(render):
+    def wrapper(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return render(self, context, request)
+        # only the outermost render is timed, nested render_to_string() calls are part of it
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - start
+    wrapper.profiled = True
+    return wrapper
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    index = max(0, -(-len(sorted_values) * pct // 100) - 1)
+    return sorted_values[int(index)]
+
+
+class ProfileStore:
+    """Last `size` samples per view, kept in memory and summarised on demand."""
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.size))
+        self.duplicates = defaultdict(Counter)
+
+    def add(self, view, sample, duplicates):
+        with self.lock:
+            self.samples[view].append(sample)
+            if duplicates:
+                counts = self.duplicates[view]
+                counts.update(duplicates)
+                if len(counts) > 2 * DUPLICATES_KEPT:
+                    self.duplicates[view] = Counter(dict(counts.most_common(DUPLICATES_KEPT)))
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+            self.duplicates.clear()
+
+    def summary(self):
+        with self.lock:
+            samples = {view: list(rows) for view, rows in self.samples.items()}
+            duplicates = {view: counts.most_common(TOP_DUPLICATES) for view, counts in self.duplicates.items()}
+
+        report = []
+        for view, rows in samples.items():
+            entry = {"view": view, "requests": len(rows)}
+            for index, metric in enumerate(METRICS):
+                values = sorted(row[index] for row in rows)
+                for pct in PERCENTILES:
+                    entry[f"{metric}_p{pct}"] = round(percentile(values, pct), 2)
+                entry[f"{metric}_max"] = round(values[-1], 2)
+            entry["duplicates"] = [{"sql": sql, "count": count} for sql, count in duplicates.get(view, [])]
+            report.append(entry)
+        report.sort(key=lambda entry: entry["wall_ms_p95"], reverse=True)
+        return report
+
+
+store = ProfileStore(getattr(settings, "PROFILING_BUFFER_SIZE", 500))
+
+
+def write_dump(path=None):
+    path = path or settings.PROFILING_DUMP_PATH
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"pid": os.getpid(), "generated_at": time.time(), "views": store.summary()}, f)
+    os.replace(tmp_path, path)
+
+
+def read_dump(path=None):
+    with open(path or settings.PROFILING_DUMP_PATH) as f:
+        return json.load(f)
+
+
+class ProfilingMiddleware:
+    """
+    Per-view wall time, DB time, query count, duplicated queries and template render time.
+
+    Off unless PROFILING_ENABLED is set. Samples stay in this process; every
+    PROFILING_DUMP_INTERVAL seconds the summary is also written to PROFILING_DUMP_PATH
+    so `manage.py profiling_report` can read it from outside the server.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.dump_interval = getattr(settings, "PROFILING_DUMP_INTERVAL", 60)
+        self.next_dump = time.monotonic() + self.dump_interval
+        self.dump_lock = threading.Lock()
+        if not getattr(Template.render, "profiled", False):
+            Template.render = _profiled_render(Template.render)
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        wall_time = time.perf_counter() - start
+
+        match = request.resolver_match
+        if match is not None:
+            duplicates = {sql: count for sql, count in profile.fingerprints.items() if count > 1}
+            store.add(
+                match.view_name,
+                (wall_time * 1000, profile.db_time * 1000, profile.queries, profile.template_time * 1000),
+                duplicates,
+            )
+            self._maybe_dump()
+        return response
+
+    def _maybe_dump(self):
+        now = time.monotonic()
+        if now < self.next_dump or not self.dump_lock.acquire(blocking=False):
+            return
+        try:
+            self.next_dump = now + self.dump_interval
+            write_dump()
+        except OSError:
+            pass
+        finally:
+            self.dump_lock.release()
+
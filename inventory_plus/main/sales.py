@@ -0,0 +1,42 @@
+from collections import Counter
+
+from django.db import transaction
+
+from inventory import caching
+from inventory.models import Product, StockMovement
+from inventory.retry import retry_on_lock
+from inventory.stock import remove_stock_many
+from .models import Sale
+from . import analytics
+
+
+@retry_on_lock
+def record_sale(items, user=None):
+    """
+    Record a basket of (product_id, quantity) lines in one transaction:
+    one SELECT for the prices, one guarded UPDATE for the stock, one bulk INSERT for the sales.
+    Raises InsufficientStock if any line would oversell, in which case nothing is written.
+    """
+    quantities = Counter()
+    for product_id, quantity in items:
+        if quantity <= 0:
+            raise ValueError("Quantities must be positive")
+        quantities[int(product_id)] += quantity
+    if not quantities:
+        raise ValueError("The basket is empty")
+
+    with transaction.atomic():
+        prices = dict(Product.objects.filter(pk__in=quantities.keys()).values_list("id", "price"))
+        missing = set(quantities) - set(prices)
+        if missing:
+            raise Product.DoesNotExist(f"Unknown products: {sorted(missing)}")
+
+        remove_stock_many(quantities, user=user, reason=StockMovement.SALE)
+        sales = Sale.objects.bulk_create([
+            Sale(product_id=product_id, quantity=quantity, price_at_sale=prices[product_id], user=user)
+            for product_id, quantity in quantities.items()
+        ])
+        # bulk_create skips post_save, so the rollups are fed directly
+        analytics.record_sales(sales)
+    caching.bump("sales")
+    return sales
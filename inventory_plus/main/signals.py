@@ -0,0 +1,36 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from inventory import caching
+from .models import Sale
+from . import analytics
+
+
+@receiver(pre_save, sender=Sale)
+def remember_sale(sender, instance, raw, **kwargs):
+    instance._rollup_before = None
+    if not raw and instance.pk is not None:
+        instance._rollup_before = Sale.objects.filter(pk=instance.pk).only(
+            "product_id", "quantity", "price_at_sale", "date"
+        ).first()
+
+
+@receiver(post_save, sender=Sale)
+def rollup_saved_sale(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    before = None if created else getattr(instance, "_rollup_before", None)
+    if before is not None:
+        analytics.remove_sales([before])
+    analytics.record_sales([instance])
+
+
+@receiver(post_delete, sender=Sale)
+def rollup_deleted_sale(sender, instance, **kwargs):
+    analytics.remove_sales([instance])
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def bump_sales_version(sender, **kwargs):
+    caching.bump("sales")
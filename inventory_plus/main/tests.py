@@ -1,3 +1,141 @@
-from django.test import TestCase
+import unittest
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from inventory.models import Product, StockMovement
+from inventory.stock import InsufficientStock
+from . import analytics
+from .forecasting import DemandForecast
+from .profiling import DUPLICATES_KEPT, ProfileStore
+from .sales import record_sale
+from .models import Sale, SalesDailyRollup, SalesRollupRebuild
+
+
+class RecordSaleTests(TestCase):
+
+    def setUp(self):
+        self.widget = Product.objects.create(name="Widget", description="", quantity=5, price=2)
+        self.gadget = Product.objects.create(name="Gadget", description="", quantity=1, price=10)
+
+    def test_basket(self):
+        sales = record_sale([(self.widget.id, 2), (self.gadget.id, 1), (self.widget.id, 1)])
+        self.assertEqual(sorted((sale.product_id, sale.quantity) for sale in sales), [(self.widget.id, 3), (self.gadget.id, 1)])
+        self.assertEqual(list(Product.objects.order_by("id").values_list("quantity", flat=True)), [2, 0])
+        self.assertEqual(StockMovement.objects.filter(reason=StockMovement.SALE).count(), 2)
+        self.assertEqual(
+            sorted(SalesDailyRollup.objects.values_list("product_id", "day", "units", "revenue", "sales_count")),
+            [(self.widget.id, timezone.localdate(), 3, 6, 1), (self.gadget.id, timezone.localdate(), 1, 10, 1)],
+        )
+
+    def test_oversold_basket_writes_nothing(self):
+        with self.assertRaises(InsufficientStock):
+            record_sale([(self.widget.id, 1), (self.gadget.id, 2)])
+        with self.assertRaises(Product.DoesNotExist):
+            record_sale([(self.widget.id, 1), (0, 1)])
+        with self.assertRaises(ValueError):
+            record_sale([(self.widget.id, 0)])
+        self.assertEqual(list(Product.objects.order_by("id").values_list("quantity", flat=True)), [5, 1])
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertFalse(SalesDailyRollup.objects.exists())
+
+
+class DemandForecastTests(TestCase):
+
+    def setUp(self):
+        self.selling = Product.objects.create(name="Selling", description="", quantity=10, low_stock_threshold=5)
+        self.unsold = Product.objects.create(name="Unsold", description="", quantity=10, low_stock_threshold=5)
+        today = timezone.localdate()
+        SalesDailyRollup.objects.bulk_create(
+            SalesDailyRollup(day=today - timedelta(days=i), product=self.selling, units=4, sales_count=1)
+            for i in range(28)
+        )
+
+    def test_matches_a_dense_computation(self):
+        rng = np.random.default_rng(0)
+        today = timezone.localdate()
+        products = [Product.objects.create(name=f"Item {i}", description="") for i in range(5)]
+        dense = np.zeros((len(products), 90))
+        for row, product in enumerate(products):
+            for offset in rng.choice(90, size=20, replace=False):
+                dense[row, offset] = rng.integers(1, 20)
+                SalesDailyRollup.objects.create(
+                    day=today - timedelta(days=89 - int(offset)), product=product, units=int(dense[row, offset])
+                )
+        forecast = DemandForecast()
+        rows = slice(2, None)  # the products from setUp come first
+        weights = 0.3 * 0.7 ** np.arange(90)[::-1]
+        np.testing.assert_allclose(forecast.moving_average[rows], dense[:, -28:].mean(axis=1))
+        np.testing.assert_allclose(forecast.smoothed[rows], dense @ weights / weights.sum())
+        np.testing.assert_allclose(forecast.std[rows], dense.std(axis=1))
+
+    def test_apply_thresholds_skips_products_without_history(self):
+        self.assertEqual(DemandForecast().apply_thresholds(), 1)
+        self.selling.refresh_from_db()
+        self.unsold.refresh_from_db()
+        self.assertGreater(self.selling.low_stock_threshold, 5)
+        self.assertEqual(self.unsold.low_stock_threshold, 5)
+
+
+class RebuildRollupsTests(TestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Widget", description="", quantity=100)
+        now = timezone.now()
+        for days_ago, quantity in [(0, 2), (0, 3), (45, 1), (100, 4)]:
+            sale = Sale.objects.create(product=self.product, quantity=quantity, price_at_sale=2)
+            Sale.objects.filter(pk=sale.pk).update(date=now - timedelta(days=days_ago))
+        # the signal filed every sale under today; the rebuild must replace that with the real history
+        SalesDailyRollup.objects.update(units=99)
+
+    def test_rebuild(self):
+        self.assertEqual(analytics.rebuild_rollups(), 3)
+        today = timezone.localdate()
+        self.assertEqual(
+            list(SalesDailyRollup.objects.order_by("day").values_list("day", "units", "sales_count")),
+            [(today - timedelta(days=100), 4, 1), (today - timedelta(days=45), 1, 1), (today, 5, 2)],
+        )
+
+    def test_old_rollups_stay_readable_until_the_swap(self):
+        seen = []
+        analytics.rebuild_rollups(progress=lambda start, stop, rows: seen.append(
+            (rows, SalesDailyRollup.objects.get().units, SalesRollupRebuild.objects.count())
+        ))
+        # 100 and 45 days ago staged in separate windows while the stale row stayed in place
+        self.assertEqual([rows for rows, _, _ in seen if rows], [1, 1])
+        self.assertEqual({units for _, units, _ in seen}, {99})
+        self.assertEqual(seen[-1][2], 2)
+        self.assertEqual(SalesDailyRollup.objects.count(), 3)
+        self.assertFalse(SalesRollupRebuild.objects.exists())
+
+    def test_skips_products_deleted_while_staging(self):
+        other = Product.objects.create(name="Gadget", description="", quantity=10)
+        sale = Sale.objects.create(product=other, quantity=1, price_at_sale=1)
+        Sale.objects.filter(pk=sale.pk).update(date=timezone.now() - timedelta(days=60))
+
+        def delete_gadget(start, stop, rows):
+            Product.objects.filter(pk=other.pk).delete()
+        analytics.rebuild_rollups(progress=delete_gadget)
+        self.assertFalse(SalesDailyRollup.objects.filter(product_id=other.pk).exists())
+        self.assertEqual(SalesDailyRollup.objects.count(), 3)
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "query plans are checked with SQLite's EXPLAIN QUERY PLAN")
+    def test_windows_use_the_date_index(self):
+        today = timezone.localdate()
+        plan = analytics._rebuild_window(today - timedelta(days=30), today).explain()
+        self.assertIn("sale_date_idx", plan)
+
+
+class ProfileStoreTests(SimpleTestCase):
+
+    def test_duplicates_are_bounded(self):
+        store = ProfileStore(size=10)
+        store.add("view", (1, 1, 2, 0), {"SELECT 1": 1000})
+        for i in range(10 * DUPLICATES_KEPT):
+            store.add("view", (1, 1, 2, 0), {f"SELECT * FROM t WHERE id IN ({i})": 2})
+        self.assertLessEqual(len(store.duplicates["view"]), 2 * DUPLICATES_KEPT)
+        self.assertEqual(store.summary()[0]["duplicates"][0], {"sql": "SELECT 1", "count": 1000})
@@ -4,5 +4,9 @@ from . import views
 app_name = "main"
 
 urlpatterns = [
-   
+    path('sales/record/', views.record_sale_view, name="record_sale_view"),
+    path('sales/report/', views.sales_report_view, name="sales_report_view"),
+    path('sales/forecast/', views.forecast_report_view, name="forecast_report_view"),
+    path('sales/export/', views.export_sales_view, name="export_sales_view"),
+    path('profiling/', views.profiling_report_view, name="profiling_report_view"),
 ]
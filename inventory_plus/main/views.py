@@ -0,0 +1,108 @@
+import json
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.shortcuts import render, redirect
+from django.contrib import messages
+from django.http import HttpRequest, HttpResponseBadRequest, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.utils import timezone
+
+from inventory.exports import EXPORT_FORMATS, streaming_export_response
+from inventory.models import Product
+from inventory.routers import read_only
+from inventory.stock import InsufficientStock
+from .sales import record_sale
+from .exports import SALE_HEADER, sale_rows
+from . import analytics
+from .forecasting import DemandForecast
+from . import profiling
+
+
+def _date_param(request, name, default):
+    try:
+        return date.fromisoformat(request.GET[name])
+    except (KeyError, ValueError):
+        return default
+
+
+@staff_member_required
+def sales_report_view(request: HttpRequest):
+    end = _date_param(request, "end", timezone.localdate())
+    start = _date_param(request, "start", end - timedelta(days=29))
+
+    return render(request, "main/sales_report.html", {
+        "start": start,
+        "end": end,
+        "totals": analytics.sales_totals(start, end),
+        "daily": analytics.revenue_by_day(start, end),
+        "top_products": analytics.top_products(start, end),
+        "categories": analytics.sales_by_category(start, end),
+    })
+
+
+@staff_member_required
+def forecast_report_view(request: HttpRequest):
+    forecast = DemandForecast()
+
+    if request.method == "POST":
+        updated = forecast.apply_thresholds()
+        messages.success(request, f"Updated low stock threshold for {updated} products", "alert-success")
+        return redirect("main:forecast_report_view")
+
+    return render(request, "main/forecast_report.html", {
+        "forecast": forecast,
+        "rows": list(forecast.rows(limit=200)),
+    })
+
+
+@staff_member_required
+@read_only
+def export_sales_view(request: HttpRequest):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format")
+    return streaming_export_response(SALE_HEADER, sale_rows(), fmt, "sales")
+
+
+@login_required
+@require_POST
+def record_sale_view(request: HttpRequest):
+    try:
+        items = [(int(line["product"]), int(line["quantity"])) for line in json.loads(request.body)["items"]]
+        sales = record_sale(items, user=request.user)
+    except InsufficientStock as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    except Product.DoesNotExist as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "Expected a JSON body like {\"items\": [{\"product\": 1, \"quantity\": 2}]}"}, status=400)
+
+    return JsonResponse({
+        "sales": [
+            {
+                "id": sale.id,
+                "product": sale.product_id,
+                "quantity": sale.quantity,
+                "price_at_sale": str(sale.price_at_sale),
+                "total_price": str(sale.total_price),
+            }
+            for sale in sales
+        ],
+        "total": str(sum(sale.total_price for sale in sales)),
+    }, status=201)
+
+
+@staff_member_required
+def profiling_report_view(request: HttpRequest):
+    if request.method == "POST":
+        profiling.store.clear()
+        messages.success(request, "Profiling samples cleared", "alert-success")
+        return redirect("main:profiling_report_view")
+
+    return render(request, "main/profiling_report.html", {
+        "enabled": settings.PROFILING_ENABLED,
+        "views": profiling.store.summary(),
+    })